@@ -2,10 +2,13 @@ import inspect
 import abc
 from typing import AsyncIterator, Callable, Protocol
 
-from .llm import LLM, Message
+from pydantic import BaseModel
+
+from .llm import LLM, Message, Usage, recording
 from .prompts import DEFAULT_SYSTEM_PROMPT
 from .skills import Skill, MethodSkill
 from .tools import Tool, MethodTool
+from .tracing import span
 
 
 class Agentic(Protocol):
@@ -54,6 +57,16 @@ class AgentBase[In, Out](Agentic):
         pass
 
 
+# the context primitives that call the LLM, which can be assigned their own model
+PRIMITIVES = ("reply", "choose", "decide", "equip", "engage", "invoke", "create", "map_reduce")
+
+
+class UsageMetrics(BaseModel):
+    total: Usage
+    by_skill: dict[str, Usage]
+    by_primitive: dict[str, Usage]
+
+
 class ChatAgent(Agentic):
     def __init__(
         self,
@@ -61,6 +74,10 @@ class ChatAgent(Agentic):
         description: str,
         llm: LLM,
         *,
+        models: dict[str, LLM] | None = None,
+        direct: bool = False,
+        memory=None,
+        tool_index=None,
         system_prompt=DEFAULT_SYSTEM_PROMPT,
         persistent:bool=True,
         skills: list | None = None,
@@ -75,6 +92,14 @@ class ChatAgent(Agentic):
         self._name = name
         self._description = description
         self._llm = llm
+        self._models = dict(models or {})
+        self._direct = direct
+        self._memory = memory
+        self._tool_index = tool_index
+
+        for primitive in self._models:
+            if primitive not in PRIMITIVES:
+                raise ValueError(f"Unknown primitive: {primitive}")
         self._skills = []
         self._tools = []
         self._system_prompt = system_prompt.format(name=name, description=description)
@@ -84,6 +109,7 @@ class ChatAgent(Agentic):
         self._tool_cls = tool_cls or MethodTool
         self._context_cls = context_cls or Context
         self._prompt_callback = prompt_callback
+        self._usage: dict[tuple[str | None, str | None], Usage] = {}
 
         # initialize predefined skills and tools
         for skill in skills or []:
@@ -120,6 +146,34 @@ class ChatAgent(Agentic):
     def llm(self):
         return self._llm
 
+    @property
+    def direct(self) -> bool:
+        """Whether classification primitives answer without reasoning by default."""
+        return self._direct
+
+    @property
+    def memory(self):
+        return self._memory
+
+    @property
+    def tool_index(self):
+        return self._tool_index
+
+    @property
+    def models(self) -> dict[str, LLM]:
+        return dict(self._models)
+
+    def llm_for(self, primitive: str) -> LLM:
+        """
+        Returns the LLM used by a context primitive,
+        which is the agent's LLM unless another one was configured for it.
+        """
+        return self._models.get(primitive, self._llm)
+
+    @property
+    def system_prompt(self) -> str:
+        return self._system_prompt
+
     async def perform(self, input: Message) -> AsyncIterator[Message]:
         """Main entrypoint for the agent.
 
@@ -127,14 +181,47 @@ class ChatAgent(Agentic):
         The skill is selected based on the messages and the skills available to the agent.
         """
         conversation_len = len(self._conversation)
-        context = self._context_cls(self, list(self._conversation) + [input])
-        skill = await context.engage()
-        await skill.execute(context)
-        self._conversation = context.messages
+        self._conversation = await self.respond(self._conversation, input)
 
         for m in self._conversation[conversation_len:]:
             yield m
 
+    async def respond(self, conversation: list[Message], input: Message) -> list[Message]:
+        """Runs a single turn over an explicit conversation.
+
+        Returns the updated conversation, including the input message.
+        Unlike `perform`, this method doesn't touch the agent's own conversation,
+        so the same agent can serve many independent sessions concurrently.
+        """
+        context = self._context_cls(self, list(conversation) + [input])
+
+        with span("agent.respond", agent=self.name) as s, recording(context.record):
+            skill = await context.engage()
+            s.set(skill=skill.name)
+            context.skill = skill
+            await skill.execute(context)
+
+        return context.messages
+
+    def account(self, skill: str | None, primitive: str | None, usage: Usage):
+        """Adds the usage of an LLM call made by a skill with a given primitive."""
+        self._usage.setdefault((skill, primitive), Usage()).add(usage)
+
+    def metrics(self) -> UsageMetrics:
+        """
+        Returns the token usage of all turns so far, in total,
+        by skill and by primitive. Calls made while selecting
+        the skill are accounted under `none`.
+        """
+        metrics = UsageMetrics(total=Usage(), by_skill={}, by_primitive={})
+
+        for (skill, primitive), usage in self._usage.items():
+            metrics.total.add(usage)
+            metrics.by_skill.setdefault(skill or "none", Usage()).add(usage)
+            metrics.by_primitive.setdefault(primitive or "none", Usage()).add(usage)
+
+        return metrics
+
     def skill(self, target) -> Skill:
         """
         Add a method as a skill to the agent.
@@ -156,14 +243,15 @@ class ChatAgent(Agentic):
         self._skills.append(skill)
         return skill
 
-    def tool(self, target) -> Tool:
+    def tool(self, target, name: str | None = None, description: str | None = None) -> Tool:
         """
         Adds a method as a tool to the agent.
 
         If the method expects an LLM at any keyword parameter, the
         agent will automatically inject it.
 
-        The method must be an async function.
+        The method must be an async function. Its name and docstring
+        are used unless `name` or `description` are given.
         """
 
         if isinstance(target, Tool):
@@ -176,8 +264,8 @@ class ChatAgent(Agentic):
         if not inspect.iscoroutinefunction(target):
             raise ValueError("Tool must be a coroutine function.")
 
-        name = target.__name__
-        description = inspect.getdoc(target) or ""
+        name = name or target.__name__
+        description = description or inspect.getdoc(target) or ""
         signature = inspect.signature(target).parameters
 
         # If the method expects an LLM, wrap it
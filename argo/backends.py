@@ -0,0 +1,364 @@
+import abc
+import asyncio
+import itertools
+import json
+from typing import Any, AsyncIterator
+
+import openai
+from pydantic import BaseModel
+
+from .llm import Usage
+from .utils import hash_embedding, sample_schema
+
+
+class LLMBackend(abc.ABC):
+    """
+    The engine that runs the calls of an `LLM`.
+    Implement this class to plug in another transport or inference engine.
+
+    Streamed calls yield text chunks and, optionally, the `Usage` of the call.
+    Payloads are lists of messages already dumped to dicts, and `kwargs`
+    are the extra parameters of the call (temperature, etc.).
+    """
+
+    @abc.abstractmethod
+    def complete(self, model: str, prompt: str, kwargs: dict) -> AsyncIterator[str | Usage]:
+        pass
+
+    @abc.abstractmethod
+    def chat(self, model: str, payload: list[dict], kwargs: dict) -> AsyncIterator[str | Usage]:
+        pass
+
+    @abc.abstractmethod
+    async def parse[T: BaseModel](
+        self, model: str, response_format: type[T], payload: list[dict], kwargs: dict
+    ) -> tuple[T | None, Usage | None]:
+        pass
+
+    async def embed(
+        self, model: str, texts: list[str], kwargs: dict
+    ) -> tuple[list[list[float]], Usage | None]:
+        raise NotImplementedError(f"{type(self).__name__} doesn't support embeddings.")
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    Calls any OpenAI-compatible server over HTTP. This is the default backend.
+    """
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None):
+        self.client = openai.AsyncOpenAI(base_url=base_url, api_key=api_key)
+
+    async def complete(self, model: str, prompt: str, kwargs: dict) -> AsyncIterator[str | Usage]:
+        async for chunk in await self.client.completions.create(
+            model=model,
+            prompt=prompt,
+            stream=True,
+            **kwargs,
+        ):
+            if getattr(chunk, "usage", None) is not None:
+                yield Usage.from_api(chunk.usage)
+
+            if chunk.choices and chunk.choices[0].text is not None:
+                yield chunk.choices[0].text
+
+    async def chat(self, model: str, payload: list[dict], kwargs: dict) -> AsyncIterator[str | Usage]:
+        async for chunk in await self.client.chat.completions.create(
+            model=model,
+            messages=payload, # type: ignore
+            stream=True,
+            **kwargs,
+        ): # type: ignore
+            if getattr(chunk, "usage", None) is not None:
+                yield Usage.from_api(chunk.usage)
+
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
+
+    async def parse[T: BaseModel](
+        self, model: str, response_format: type[T], payload: list[dict], kwargs: dict
+    ) -> tuple[T | None, Usage | None]:
+        response = await self.client.beta.chat.completions.parse(
+            model=model,
+            messages=payload, # type: ignore
+            response_format=response_format,
+            **kwargs,
+        )
+
+        usage = Usage.from_api(response.usage) if response.usage is not None else None
+        return response.choices[0].message.parsed, usage
+
+    async def embed(
+        self, model: str, texts: list[str], kwargs: dict
+    ) -> tuple[list[list[float]], Usage | None]:
+        response = await self.client.embeddings.create(model=model, input=texts, **kwargs)
+        usage = Usage.from_api(response.usage) if response.usage is not None else None
+        return [item.embedding for item in response.data], usage
+
+
+class FakeBackend(LLMBackend):
+    """
+    Answers every call instantly from memory, with no network at all.
+
+    Useful in tests, and to measure argo's own overhead.
+    Chat and completion calls stream `reply` word by word (replies are
+    cycled through if several are given). Structured outputs are taken
+    from `objects` by model name, or else built from the model's schema
+    (first enum value, `true`, zeros, etc.).
+    Embeddings are deterministic bags of hashed words.
+
+        llm = LLM("fake", backend=FakeBackend(objects={"Decide": {"result": False}}))
+
+    Every request is kept in `requests`, to make assertions on them.
+    """
+
+    def __init__(
+        self,
+        reply: str | list[str] = "This is a fake reply.",
+        objects: dict[str, dict] | None = None,
+        latency: float = 0.0,
+    ):
+        self.replies = [reply] if isinstance(reply, str) else list(reply)
+        self._replies = itertools.cycle(self.replies)
+        self.objects = objects or {}
+        self.latency = latency
+        self.requests: list[tuple[str, Any]] = []
+
+    def _usage(self, prompt: Any, completion: str) -> Usage:
+        return Usage(
+            calls=1,
+            prompt_tokens=len(json.dumps(prompt)) // 4,
+            completion_tokens=len(completion.split()),
+        )
+
+    async def _reply(self, prompt: Any, reply: str) -> AsyncIterator[str | Usage]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        for word in reply.split(" "):
+            yield word + " "
+
+        yield self._usage(prompt, reply)
+
+    def complete(self, model: str, prompt: str, kwargs: dict) -> AsyncIterator[str | Usage]:
+        self.requests.append(("complete", prompt))
+        return self._reply(prompt, next(self._replies))
+
+    def chat(self, model: str, payload: list[dict], kwargs: dict) -> AsyncIterator[str | Usage]:
+        self.requests.append(("chat", payload))
+        return self._reply(payload, next(self._replies))
+
+    async def parse[T: BaseModel](
+        self, model: str, response_format: type[T], payload: list[dict], kwargs: dict
+    ) -> tuple[T | None, Usage | None]:
+        self.requests.append(("parse", payload))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        data = self.objects.get(response_format.__name__)
+
+        if data is None:
+            data = sample_schema(response_format.model_json_schema())
+
+        return response_format.model_validate(data), self._usage(payload, json.dumps(data))
+
+    async def embed(
+        self, model: str, texts: list[str], kwargs: dict
+    ) -> tuple[list[list[float]], Usage | None]:
+        self.requests.append(("embed", texts))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        usage = Usage(calls=1, prompt_tokens=sum(len(t.split()) for t in texts))
+        return [hash_embedding(text) for text in texts], usage
+
+
+class BatchedBackend(LLMBackend):
+    """
+    Wraps another backend to send concurrent embedding calls as a single request.
+
+    Calls arriving within `max_wait` seconds of each other are grouped,
+    up to `max_texts` texts per request, so many small `embed` calls
+    (e.g., from concurrent sessions) cost one round trip.
+    Chat completions can't be combined in one request by OpenAI-compatible APIs,
+    so the other calls go straight to the wrapped backend.
+
+        llm = LLM("text-embedding-3-small", backend=BatchedBackend(OpenAIBackend()))
+    """
+
+    def __init__(self, backend: LLMBackend, max_texts: int = 256, max_wait: float = 0.005):
+        self.backend = backend
+        self.max_texts = max_texts
+        self.max_wait = max_wait
+        self._pending: dict[tuple, list[tuple[list[str], asyncio.Future]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def complete(self, model: str, prompt: str, kwargs: dict) -> AsyncIterator[str | Usage]:
+        return self.backend.complete(model, prompt, kwargs)
+
+    def chat(self, model: str, payload: list[dict], kwargs: dict) -> AsyncIterator[str | Usage]:
+        return self.backend.chat(model, payload, kwargs)
+
+    async def parse[T: BaseModel](
+        self, model: str, response_format: type[T], payload: list[dict], kwargs: dict
+    ) -> tuple[T | None, Usage | None]:
+        return await self.backend.parse(model, response_format, payload, kwargs)
+
+    async def embed(
+        self, model: str, texts: list[str], kwargs: dict
+    ) -> tuple[list[list[float]], Usage | None]:
+        # only calls with the same model and parameters can share a request
+        key = (model, json.dumps(kwargs, sort_keys=True, default=str))
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.get(key)
+
+        if batch is None:
+            batch = self._pending[key] = []
+            asyncio.get_running_loop().call_later(self.max_wait, self._flush, key, batch)
+
+        batch.append((texts, future))
+
+        if sum(len(t) for t, _ in batch) >= self.max_texts:
+            self._flush(key, batch)
+
+        return await future
+
+    def _flush(self, key: tuple, batch: list):
+        # the timer of a batch that was already flushed when full does nothing
+        if self._pending.get(key) is not batch:
+            return
+
+        del self._pending[key]
+        task = asyncio.ensure_future(self._send(key[0], json.loads(key[1]), batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, model: str, kwargs: dict, batch: list[tuple[list[str], asyncio.Future]]):
+        try:
+            vectors, usage = await self.backend.embed(
+                model, [text for texts, _ in batch for text in texts], kwargs
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+            return
+
+        start = 0
+
+        for i, (texts, future) in enumerate(batch):
+            if not future.done():
+                # the usage of the request is accounted once, to the first call
+                future.set_result((vectors[start : start + len(texts)], usage if i == 0 else None))
+
+            start += len(texts)
+
+
+_DONE = object()
+
+
+class LlamaCppBackend(LLMBackend):
+    """
+    Runs a GGUF model in the same process with llama.cpp,
+    with no server, network or serialization in between.
+    Requires the `llama-cpp-python` package (the `local` group).
+
+    Structured outputs are generated with a grammar built from the JSON schema
+    of the model, so they are always valid. The model name passed by `LLM` is ignored.
+
+        llm = LLM("qwen", backend=LlamaCppBackend("models/qwen2.5-0.5b-instruct-q4_k_m.gguf"))
+
+    The engine is not thread-safe, so calls run one at a time,
+    in a worker thread to keep the event loop responsive.
+    """
+
+    # OpenAI parameters with no equivalent in llama.cpp
+    _UNSUPPORTED = ("stream_options", "n", "user", "store", "metadata")
+
+    def __init__(self, model_path: str | None = None, llama=None, **options):
+        if llama is None:
+            from llama_cpp import Llama
+
+            options.setdefault("verbose", False)
+            llama = Llama(model_path=model_path, **options)
+
+        self.llama = llama
+        self._lock = asyncio.Lock()
+
+    def _options(self, kwargs: dict) -> dict:
+        return {k: v for k, v in kwargs.items() if k not in self._UNSUPPORTED}
+
+    def _usage(self, usage: dict | None) -> Usage | None:
+        if not usage:
+            return None
+
+        return Usage(
+            calls=1,
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+        )
+
+    async def _run(self, function, *args, **kwargs):
+        async with self._lock:
+            return await asyncio.to_thread(function, *args, **kwargs)
+
+    async def _stream(self, chunks, text) -> AsyncIterator[str | Usage]:
+        # the generator does the actual work, so every step runs in the thread
+        count = 0
+
+        while (chunk := await asyncio.to_thread(next, chunks, _DONE)) is not _DONE:
+            content = text(chunk)
+
+            if content:
+                count += 1
+                yield content
+
+        # llama.cpp streams one token per chunk, and keeps the prompt and reply in its context
+        yield Usage(
+            calls=1,
+            prompt_tokens=max(self.llama.n_tokens - count, 0),
+            completion_tokens=count,
+        )
+
+    async def complete(self, model: str, prompt: str, kwargs: dict) -> AsyncIterator[str | Usage]:
+        async with self._lock:
+            chunks = await asyncio.to_thread(
+                self.llama.create_completion, prompt, stream=True, **self._options(kwargs)
+            )
+
+            async for event in self._stream(chunks, lambda c: c["choices"][0]["text"]):
+                yield event
+
+    async def chat(self, model: str, payload: list[dict], kwargs: dict) -> AsyncIterator[str | Usage]:
+        async with self._lock:
+            chunks = await asyncio.to_thread(
+                self.llama.create_chat_completion,
+                messages=payload,
+                stream=True,
+                **self._options(kwargs),
+            )
+
+            async for event in self._stream(chunks, lambda c: c["choices"][0]["delta"].get("content")):
+                yield event
+
+    async def parse[T: BaseModel](
+        self, model: str, response_format: type[T], payload: list[dict], kwargs: dict
+    ) -> tuple[T | None, Usage | None]:
+        response: Any = await self._run(
+            self.llama.create_chat_completion,
+            messages=payload,
+            response_format=dict(type="json_object", schema=response_format.model_json_schema()),
+            **self._options(kwargs),
+        )
+
+        content = response["choices"][0]["message"]["content"]
+        return response_format.model_validate(json.loads(content)), self._usage(response.get("usage"))
+
+    async def embed(
+        self, model: str, texts: list[str], kwargs: dict
+    ) -> tuple[list[list[float]], Usage | None]:
+        response: Any = await self._run(self.llama.create_embedding, input=texts)
+        return [item["embedding"] for item in response["data"]], self._usage(response.get("usage"))
@@ -0,0 +1,189 @@
+import asyncio
+import csv
+import json
+import os
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Iterator
+
+from pydantic import BaseModel
+
+from .agent import ChatAgent
+from .llm import Message
+
+
+class BatchItem(BaseModel):
+    id: str
+    input: str
+
+
+class BatchResult(BaseModel):
+    id: str
+    input: str
+    output: str | None = None
+    error: str | None = None
+
+
+class BatchSummary(BaseModel):
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+def read_inputs(path, field: str = "input", id_field: str = "id") -> Iterator[BatchItem]:
+    """
+    Streams batch items from a JSONL or CSV file.
+
+    Each JSONL line can be a plain string or an object with the input in `field`.
+    CSV files must have a header with a `field` column.
+    Items without an `id_field` are identified by their position in the file.
+    """
+    path = Path(path)
+
+    with open(path, newline="") as fp:
+        if path.suffix == ".csv":
+            rows = csv.DictReader(fp)
+        else:
+            rows = (json.loads(line) for line in fp if line.strip())
+
+        for i, row in enumerate(rows):
+            if isinstance(row, str):
+                yield BatchItem(id=str(i), input=row)
+            else:
+                yield BatchItem(id=str(row.get(id_field, i)), input=row[field])
+
+
+def completed(path) -> set[str]:
+    """
+    Returns the ids already written to a results file without errors.
+    """
+    if not os.path.exists(path):
+        return set()
+
+    done = set()
+
+    with open(path) as fp:
+        for line in fp:
+            # a partially written last line means that item didn't finish
+            try:
+                result = BatchResult.model_validate_json(line)
+            except ValueError:
+                continue
+
+            if result.error is None:
+                done.add(result.id)
+
+    return done
+
+
+def _drop_partial_line(path, block: int = 4096):
+    """
+    Truncates a partially written last line (e.g., from a crash),
+    so appended results start on a line of their own.
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, "rb+") as fp:
+        end = fp.seek(0, os.SEEK_END)
+        position = end
+
+        # search backwards for the last newline, one block at a time
+        while position > 0:
+            start = max(0, position - block)
+            fp.seek(start)
+            chunk = fp.read(position - start)
+
+            if position == end and chunk.endswith(b"\n"):
+                return
+
+            newline = chunk.rfind(b"\n")
+
+            if newline != -1:
+                fp.truncate(start + newline + 1)
+                return
+
+            position = start
+
+        fp.truncate(0)
+
+
+async def process(agent: ChatAgent, item: BatchItem) -> BatchResult:
+    """
+    Runs a single item through a fresh session of the agent.
+    Errors are captured in the result instead of raised.
+    """
+    try:
+        conversation = await agent.respond(
+            [Message.system(agent.system_prompt)], Message.user(item.input)
+        )
+    except Exception as e:
+        return BatchResult(id=item.id, input=item.input, error=f"{type(e).__name__}: {e}")
+
+    return BatchResult(id=item.id, input=item.input, output=conversation[-1].dump()["content"])
+
+
+async def stream_batch(
+    agent: ChatAgent, items: Iterable[BatchItem], concurrency: int = 8
+) -> AsyncIterator[BatchResult]:
+    """
+    Runs all items through the agent with at most `concurrency` items at once,
+    yielding results as they complete (not in input order).
+
+    Items are consumed lazily, so arbitrarily large inputs use bounded memory.
+    """
+    pending: set[asyncio.Task] = set()
+
+    for item in items:
+        if len(pending) >= concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                yield task.result()
+
+        pending.add(asyncio.create_task(process(agent, item)))
+
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+        for task in done:
+            yield task.result()
+
+
+async def run_batch(
+    agent: ChatAgent,
+    items: Iterable[BatchItem],
+    output,
+    concurrency: int = 8,
+    resume: bool = True,
+) -> BatchSummary:
+    """
+    Runs all items through the agent and appends results to a JSONL file as they complete.
+
+    If `resume` is True, items already completed in `output` (e.g., from an interrupted run)
+    are skipped, so the output file doubles as a checkpoint. Failed items are retried.
+    Otherwise, the output file is overwritten.
+    """
+    summary = BatchSummary()
+    done = completed(output) if resume else set()
+
+    def pending():
+        for item in items:
+            if item.id in done:
+                summary.skipped += 1
+            else:
+                yield item
+
+    if resume:
+        _drop_partial_line(output)
+
+    with open(output, "a" if resume else "w") as fp:
+        async for result in stream_batch(agent, pending(), concurrency):
+            fp.write(result.model_dump_json() + "\n")
+            fp.flush()
+
+            summary.processed += 1
+
+            if result.error is not None:
+                summary.failed += 1
+
+    return summary
@@ -0,0 +1,373 @@
+import asyncio
+import collections
+import multiprocessing
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from multiprocessing.managers import SyncManager
+
+from .crew import MessageBoard
+
+
+def type_key(t: type) -> str:
+    """A stable name for a message type, shared by all processes."""
+    return f"{t.__module__}.{t.__qualname__}"
+
+
+class _Backoff:
+    """Polling delays that start small and grow up to a maximum."""
+
+    def __init__(self, minimum: float = 0.001, maximum: float = 0.1):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.delay = minimum
+
+    async def wait(self):
+        await asyncio.sleep(self.delay)
+        self.delay = min(self.delay * 2, self.maximum)
+
+
+async def _claim(take, give_back):
+    """
+    Runs a blocking `take` in a thread. If the caller is cancelled meanwhile,
+    the thread still runs to the end, so whatever it took is given back.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(take))
+
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        try:
+            taken = await future
+        except queue.Empty:
+            taken = None
+
+        if taken is not None:
+            await asyncio.to_thread(give_back, taken)
+
+        raise
+
+
+_server_queues: dict[str, queue.Queue] = {}
+_server_lock = threading.Lock()
+
+
+def _board_queue(key: str) -> queue.Queue:
+    # runs in the manager process, so every client gets the same queue
+    with _server_lock:
+        if key not in _server_queues:
+            _server_queues[key] = queue.Queue()
+
+        return _server_queues[key]
+
+
+class BoardManager(SyncManager):
+    """A manager that creates the queues of a `ProcessBoard` on request."""
+
+
+BoardManager.register("board_queue", _board_queue)
+
+
+class ProcessBoard(MessageBoard):
+    """
+    A message board shared by several processes in the same host.
+
+    Queues live in a `BoardManager` server, so the board can be
+    passed to child processes (e.g., one `Crew` per process), and all of
+    them will see the same messages. Children reconnect to the server
+    by its address, so any process can create queues for new message types.
+    Messages must be picklable.
+    """
+
+    def __init__(self, manager: BoardManager | None = None, poll_interval: float = 0.05):
+        if manager is None:
+            manager = BoardManager()
+            manager.start()
+
+        if not isinstance(manager, BoardManager):
+            raise TypeError("ProcessBoard requires a BoardManager.")
+
+        self._manager: BoardManager | None = manager
+        self._address = manager.address
+        self._id = uuid.uuid4().hex
+        self._connect_lock = threading.Lock()
+        self._cache = {}
+        # messages taken by this process and not acknowledged yet, which still count as pending
+        self._taken: collections.Counter[type] = collections.Counter()
+        self._claims: dict[int, type] = {}
+        self._claim_lock = threading.Lock()
+        self.poll_interval = poll_interval
+
+    def __getstate__(self):
+        # the manager itself can't be pickled, so children reconnect by address
+        state = dict(self.__dict__)
+        state["_manager"] = None
+        state["_connect_lock"] = None
+        state["_cache"] = {}
+        state["_taken"] = collections.Counter()
+        state["_claims"] = {}
+        state["_claim_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._connect_lock = threading.Lock()
+        self._claim_lock = threading.Lock()
+
+    def _connect(self) -> BoardManager:
+        with self._connect_lock:
+            if self._manager is None:
+                manager = BoardManager(
+                    address=self._address, authkey=bytes(multiprocessing.current_process().authkey)
+                )
+                manager.connect()
+                self._manager = manager
+
+            return self._manager
+
+    def _queue_sync(self, message_type: type):
+        q = self._cache.get(message_type)
+
+        if q is None:
+            # queues are namespaced by board, so boards can share a manager
+            q = self._connect().board_queue(f"{self._id}:{type_key(message_type)}")  # type: ignore
+            self._cache[message_type] = q
+
+        return q
+
+    async def _queue(self, message_type: type):
+        q = self._cache.get(message_type)
+
+        if q is None:
+            q = await asyncio.to_thread(self._queue_sync, message_type)
+
+        return q
+
+    def _take(self, q, message_type: type):
+        # taking and counting under the same lock as `_count`, so a message
+        # on its way to a worker is never missed
+        with self._claim_lock:
+            message = q.get_nowait()
+            self._taken[message_type] += 1
+
+        return message
+
+    def _give_back(self, q, message_type: type, message):
+        with self._claim_lock:
+            q.put(message)
+            self._taken[message_type] -= 1
+
+    def _count(self, q, message_type: type) -> int:
+        with self._claim_lock:
+            return q.qsize() + self._taken[message_type]
+
+    async def get[T](self, message_type: type[T]) -> T:
+        q = await self._queue(message_type)
+        backoff = _Backoff(maximum=self.poll_interval)
+
+        while True:
+            try:
+                message = await _claim(
+                    lambda: self._take(q, message_type),
+                    lambda message: self._give_back(q, message_type, message),
+                )
+            except queue.Empty:
+                await backoff.wait()
+                continue
+
+            self._claims[id(message)] = message_type
+            return message
+
+    async def ack(self, message):
+        message_type = self._claims.pop(id(message), None)
+
+        if message_type is not None:
+            with self._claim_lock:
+                self._taken[message_type] -= 1
+
+    async def release(self, message):
+        message_type = self._claims.pop(id(message), None)
+
+        if message_type is not None:
+            q = await self._queue(message_type)
+            await asyncio.to_thread(self._give_back, q, message_type, message)
+
+    async def post[T](self, message: T):
+        q = await self._queue(type(message))
+        await asyncio.to_thread(q.put, message)
+
+    async def size(self, message_type: type, subscriber: str | None = None) -> int:
+        q = await self._queue(message_type)
+        return await asyncio.to_thread(self._count, q, message_type)
+
+
+class SQLiteBoard(MessageBoard):
+    """
+    A durable message board backed by a SQLite database.
+
+    Posted messages are persisted until an agent has processed them (see `ack`),
+    so pending work survives restarts, and several processes in the same host
+    can share the board. Messages taken by a worker that died are delivered again
+    once their `lease` (in seconds) expires, so processing a message must take less than that.
+    Messages must be picklable.
+    """
+
+    def __init__(self, path: str, poll_interval: float = 0.1, lease: float = 300):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._local = threading.local()
+        self._claims: dict[int, int] = {}
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "type TEXT NOT NULL, "
+                "payload BLOB NOT NULL, "
+                "claimed REAL)"
+            )
+
+            # boards created before messages were acknowledged
+            columns = {row[1] for row in db.execute("PRAGMA table_info(messages)")}
+
+            if "claimed" not in columns:
+                db.execute("ALTER TABLE messages ADD COLUMN claimed REAL")
+
+            db.execute("CREATE INDEX IF NOT EXISTS messages_type ON messages (type, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.db = db
+
+        return db
+
+    def _take(self, key: str) -> tuple[int, bytes] | None:
+        # claiming and returning in a single statement makes the claim atomic,
+        # and claims older than the lease belong to dead workers, so they are taken again
+        now = time.time()
+        return self._connect().execute(
+            "UPDATE messages SET claimed = ? WHERE id = "
+            "(SELECT id FROM messages WHERE type = ? AND (claimed IS NULL OR claimed < ?) "
+            "ORDER BY id LIMIT 1) "
+            "RETURNING id, payload",
+            (now, key, now - self.lease),
+        ).fetchone()
+
+    def _delete(self, id: int):
+        self._connect().execute("DELETE FROM messages WHERE id = ?", (id,))
+
+    def _unclaim(self, id: int):
+        self._connect().execute("UPDATE messages SET claimed = NULL WHERE id = ?", (id,))
+
+    def _put(self, key: str, payload: bytes):
+        self._connect().execute(
+            "INSERT INTO messages (type, payload) VALUES (?, ?)", (key, payload)
+        )
+
+    async def get[T](self, message_type: type[T]) -> T:
+        key = type_key(message_type)
+        backoff = _Backoff(maximum=self.poll_interval)
+
+        while True:
+            row = await _claim(lambda: self._take(key), lambda row: self._unclaim(row[0]))
+
+            if row is not None:
+                message = pickle.loads(row[1])
+                self._claims[id(message)] = row[0]
+                return message
+
+            await backoff.wait()
+
+    async def ack(self, message):
+        row = self._claims.pop(id(message), None)
+
+        if row is not None:
+            await asyncio.to_thread(self._delete, row)
+
+    async def release(self, message):
+        row = self._claims.pop(id(message), None)
+
+        if row is not None:
+            await asyncio.to_thread(self._unclaim, row)
+
+    async def post[T](self, message: T):
+        await asyncio.to_thread(self._put, type_key(type(message)), pickle.dumps(message))
+
+    def _count(self, key: str) -> int:
+        # claimed messages are still pending until they are acknowledged
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM messages WHERE type = ?", (key,)
+        ).fetchone()[0]
+
+    async def size(self, message_type: type, subscriber: str | None = None) -> int:
+        return await asyncio.to_thread(self._count, type_key(message_type))
+
+    def pending(self) -> int:
+        """Number of messages waiting to be taken or acknowledged."""
+        return self._connect().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+
+class RedisBoard(MessageBoard):
+    """
+    A message board backed by a Redis (or Redis-compatible) server.
+
+    Each message type is a Redis list, so crews in different hosts can
+    share the board, and messages persist as long as the server does.
+    Messages must be picklable.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        prefix: str = "argo:board:",
+        poll_interval: float = 1,
+    ):
+        from .resp import RedisClient
+
+        self.client = RedisClient(host, port, db)
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+        self._idle: list[RedisClient] = []
+
+    async def get[T](self, message_type: type[T]) -> T:
+        key = self.prefix + type_key(message_type)
+        # blocking pops need a connection of their own
+        conn = self._idle.pop() if self._idle else self.client.connection()
+
+        try:
+            while True:
+                pop = asyncio.ensure_future(conn.execute("BLPOP", key, self.poll_interval))
+
+                try:
+                    reply = await asyncio.shield(pop)
+                except asyncio.CancelledError:
+                    # don't lose a message that was popped while cancelling
+                    reply = await pop
+
+                    if reply is not None:
+                        await self.client.execute("LPUSH", key, reply[1])
+
+                    raise
+
+                if reply is not None:
+                    return pickle.loads(reply[1])
+        finally:
+            self._idle.append(conn)
+
+    async def post[T](self, message: T):
+        await self.client.execute(
+            "RPUSH", self.prefix + type_key(type(message)), pickle.dumps(message)
+        )
+
+    async def size(self, message_type: type, subscriber: str | None = None) -> int:
+        return await self.client.execute("LLEN", self.prefix + type_key(message_type))
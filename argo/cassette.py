@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Literal
+
+from pydantic import BaseModel
+
+from .llm import Usage
+
+
+class CassetteMiss(LookupError):
+    """Raised when replaying a request that was never recorded."""
+
+
+class Cassette:
+    """
+    Records LLM responses to a file and replays them later,
+    so skills can be tested and benchmarked offline and deterministically.
+
+    Each request is keyed by a hash of everything sent to the model
+    (method, model name, messages, response format and arguments).
+    The file is JSONL, with one line per recorded response; if a request
+    is recorded several times, the last line wins.
+
+    Modes:
+     - `replay`: only replay, raising `CassetteMiss` for unknown requests.
+     - `record`: always call the model, and record (or overwrite) the response.
+     - `auto`: replay known requests, and record the unknown ones.
+
+    Streamed responses keep the time of each chunk, and are replayed
+    `speed` times faster than recorded. The default of 0 replays instantly.
+
+        llm = LLM("gpt-4o", cassette=Cassette("tests/cassettes/chat.jsonl"))
+    """
+
+    def __init__(
+        self,
+        path,
+        mode: Literal["record", "replay", "auto"] = "auto",
+        speed: float = 0,
+    ):
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.entries: dict[str, dict] = {}
+
+        if os.path.exists(path):
+            with open(path) as fp:
+                for line in fp:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    @staticmethod
+    def key(request: Any) -> str:
+        data = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+    def _lookup(self, key: str) -> dict | None:
+        if self.mode != "record" and key in self.entries:
+            return self.entries[key]
+
+        if self.mode == "replay":
+            raise CassetteMiss(f"No recorded response for request {key} in {self.path}.")
+
+        return None
+
+    def _save(self, entry: dict):
+        self.entries[entry["key"]] = entry
+
+        with open(self.path, "a") as fp:
+            fp.write(json.dumps(entry) + "\n")
+
+    async def _wait(self, delay: float):
+        if self.speed > 0 and delay > 0:
+            await asyncio.sleep(delay / self.speed)
+
+    async def stream(
+        self, request: Any, source: Callable[[], AsyncIterator[str | Usage]]
+    ) -> AsyncIterator[str | Usage]:
+        """
+        Replays the chunks of a streamed response,
+        or records them from `source` as they arrive.
+        """
+        key = self.key(request)
+        entry = self._lookup(key)
+
+        if entry is not None:
+            elapsed = 0.0
+
+            for t, chunk in entry["chunks"]:
+                await self._wait(t - elapsed)
+                elapsed = t
+                yield chunk
+
+            if entry["usage"] is not None:
+                yield Usage(**entry["usage"])
+
+            return
+
+        start = time.monotonic()
+        chunks = []
+        usage = None
+
+        async for event in source():
+            if isinstance(event, Usage):
+                usage = event.model_dump()
+            else:
+                chunks.append((round(time.monotonic() - start, 4), event))
+
+            yield event
+
+        self._save(dict(key=key, chunks=chunks, usage=usage))
+
+    async def parse[T: BaseModel](
+        self,
+        request: Any,
+        model: type[T],
+        source: Callable[[], Awaitable[tuple[T | None, Usage | None]]],
+    ) -> tuple[T | None, Usage | None]:
+        """
+        Replays a structured response, or records it from `source`.
+        """
+        key = self.key(request)
+        entry = self._lookup(key)
+
+        if entry is not None:
+            await self._wait(entry["elapsed"])
+            result = entry["result"]
+            usage = entry["usage"]
+
+            return (
+                model.model_validate(result) if result is not None else None,
+                Usage(**usage) if usage is not None else None,
+            )
+
+        start = time.monotonic()
+        result, usage = await source()
+
+        self._save(
+            dict(
+                key=key,
+                elapsed=round(time.monotonic() - start, 4),
+                result=result.model_dump(mode="json") if result is not None else None,
+                usage=usage.model_dump() if usage is not None else None,
+            )
+        )
+
+        return result, usage
@@ -1,4 +1,5 @@
 import asyncio
+import os
 import sys
 
 from pathlib import Path
@@ -10,6 +11,7 @@ from argo.client import stream
 from .agent import ChatAgent
 from .llm import LLM, Message
 from .declarative import parse
+from .tracing import configure_from_env
 
 
 dotenv.load_dotenv()
@@ -99,25 +101,120 @@ def serve(
     ),
     host: str = Option("127.0.0.1", "--host", "-h", help="Host IP to bind to."),
     port: int = Option(8000, "--port", "-p", help="Port to bind to."),
+    workers: int = Option(1, "--workers", "-w", help="Number of worker processes."),
+    store: str = Option(
+        None,
+        "--store",
+        "-s",
+        help="Session store URL (memory://, sqlite:///path.db, log:///path.log, redis://host:port/db).",
+        envvar="ARGO_STORE",
+    ),
+    window: int = Option(
+        None, "--window", help="Only load the last N messages of each session."
+    ),
+    watch: bool = Option(
+        False, "--watch", help="Reload the agent when the YAML file changes."
+    ),
     verbose: bool = Option(False, "--verbose", "-v", help="Enable verbose mode."),
 ):
     """
     Start a FastAPI server to run an agent in API-mode.
     """
     try:
-        from .server import serve as serve_loop
+        from .server import serve as serve_loop, serve_workers
+        from .sessions import open_store
     except ImportError:
         print("Please install argo[server] to use this command.")
         raise Exit(1)
 
+    if workers > 1:
+        # workers rebuild the agent from the environment
+        os.environ["MODEL"] = model
+
+        if api_key:
+            os.environ["API_KEY"] = api_key
+        if base_url:
+            os.environ["BASE_URL"] = base_url
+        if verbose:
+            os.environ["ARGO_VERBOSE"] = "1"
+
+        try:
+            serve_workers(
+                path, workers, host=host, port=port, store=store, window=window, watch=watch
+            )
+        except ValueError as e:
+            rich.print(f"[red]{e}[/red]")
+            raise Exit(1)
+
+        return
+
+    llm = LLM(model=model, api_key=api_key, base_url=base_url, verbose=verbose)
+
+    config = parse(path)
+    agent = config.compile(llm)
+    serve_loop(
+        agent,
+        host=host,
+        port=port,
+        store=open_store(store),
+        window=window,
+        watch=str(path) if watch else None,
+    )
+
+
+@app.command()
+def batch(
+    path: Path = Argument(help="A YAML file with an agent definition."),
+    inputs: Path = Argument(help="A JSONL or CSV file with one input per item."),
+    output: Path = Option(
+        "results.jsonl", "--output", "-o", help="JSONL file to write results to."
+    ),
+    concurrency: int = Option(
+        8, "--concurrency", "-c", help="Maximum number of items processed at once."
+    ),
+    field: str = Option("input", "--field", "-f", help="Name of the input field."),
+    resume: bool = Option(
+        True, "--resume/--no-resume", help="Skip items already completed in the output."
+    ),
+    api_key: str = Option(
+        None, "--api-key", "-k", help="API key for the LLM.", envvar="API_KEY"
+    ),
+    base_url: str = Option(
+        None, "--base-url", "-u", help="Base URL for the LLM.", envvar="BASE_URL"
+    ),
+    model: str = Option(
+        ..., "--model", "-m", help="Model to use for the LLM.", envvar="MODEL"
+    ),
+    verbose: bool = Option(False, "--verbose", "-v", help="Enable verbose mode."),
+):
+    """
+    Run an agent defined in a YAML file over a dataset of inputs.
+    """
+    from .batch import read_inputs, run_batch
+
     llm = LLM(model=model, api_key=api_key, base_url=base_url, verbose=verbose)
 
     config = parse(path)
     agent = config.compile(llm)
-    serve_loop(agent, host=host, port=port)
+
+    summary = asyncio.run(
+        run_batch(
+            agent,
+            read_inputs(inputs, field=field),
+            output,
+            concurrency=concurrency,
+            resume=resume,
+        )
+    )
+
+    rich.print(
+        f"[green]Processed {summary.processed} items[/green] "
+        f"([red]{summary.failed} failed[/red], {summary.skipped} skipped)."
+    )
 
 
 def main():
+    configure_from_env()
     app()
 
 
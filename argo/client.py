@@ -1,42 +1,57 @@
 from .agent import ChatAgent, Message
+from .llm import streaming
 import queue
 import threading
 import asyncio
 from typing import Iterator
 
 
-def invoke(agent: ChatAgent, message: str) -> str:
+_background_loop: asyncio.AbstractEventLoop | None = None
+_background_lock = threading.Lock()
+
+
+def _loop() -> asyncio.AbstractEventLoop:
     """
-    A synchronous method that calls an agent and waits
-    for the full response, returning the final message.
+    Returns an event loop running forever in a background thread.
+
+    All synchronous calls share this loop, since async clients
+    (like the LLM's HTTP connections) can't be reused across loops.
     """
-    token_queue = queue.Queue()
+    global _background_loop
 
-    # Temporarily override the LLM's callback to use our queue
-    original_callback = agent.llm.callback
-    agent.llm.callback = lambda chunk: token_queue.put(chunk)
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, daemon=True).start()
 
+        return _background_loop
+
+
+def _start(agent: ChatAgent, message: str, token_queue: queue.Queue):
+    """Runs the agent in the background loop, sending tokens to the queue."""
     user_message = Message.user(message)
 
     async def perform_chat():
-        """The async task that the background thread will run."""
+        """The async task that the background loop will run."""
         try:
-            async for _ in agent.perform(user_message):
-                pass
-        except:
-            raise
+            with streaming(token_queue.put):
+                async for _ in agent.perform(user_message):
+                    pass
         finally:
             token_queue.put(None)  # Sentinel to signal the end
 
-    def run_in_background():
-        """Thread target to run the asyncio event loop."""
-        asyncio.run(perform_chat())
+    return asyncio.run_coroutine_threadsafe(perform_chat(), _loop())
 
-    # Start the agent in a background thread
-    thread = threading.Thread(target=run_in_background)
-    thread.start()
 
-    # Yield tokens from the queue as they arrive
+def invoke(agent: ChatAgent, message: str) -> str:
+    """
+    A synchronous method that calls an agent and waits
+    for the full response, returning the final message.
+    """
+    token_queue = queue.Queue()
+    future = _start(agent, message, token_queue)
+
+    # Collect tokens from the queue as they arrive
     response = []
     while True:
         token = token_queue.get()
@@ -44,9 +59,8 @@ def invoke(agent: ChatAgent, message: str) -> str:
             break
         response.append(token)
 
-    # Wait for the thread to finish and restore the original callback
-    thread.join()
-    agent.llm.callback = original_callback
+    # Raise any error from the agent
+    future.result()
     return "".join(response)
 
 
@@ -67,30 +81,7 @@ def stream(agent: ChatAgent, message: str) -> Iterator[str]:
         str: Tokens from the agent's response as they are generated.
     """
     token_queue = queue.Queue()
-
-    # Temporarily override the LLM's callback to use our queue
-    original_callback = agent.llm.callback
-    agent.llm.callback = lambda chunk: token_queue.put(chunk)
-
-    user_message = Message.user(message)
-
-    async def perform_chat():
-        """The async task that the background thread will run."""
-        try:
-            async for _ in agent.perform(user_message):
-                pass
-        except:
-            raise
-        finally:
-            token_queue.put(None)  # Sentinel to signal the end
-
-    def run_in_background():
-        """Thread target to run the asyncio event loop."""
-        asyncio.run(perform_chat())
-
-    # Start the agent in a background thread
-    thread = threading.Thread(target=run_in_background)
-    thread.start()
+    future = _start(agent, message, token_queue)
 
     # Yield tokens from the queue as they arrive
     while True:
@@ -99,6 +90,5 @@ def stream(agent: ChatAgent, message: str) -> Iterator[str]:
             break
         yield token
 
-    # Wait for the thread to finish and restore the original callback
-    thread.join()
-    agent.llm.callback = original_callback
+    # Raise any error from the agent
+    future.result()
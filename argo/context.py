@@ -1,16 +1,21 @@
+import asyncio
+import contextvars
+import copy
+import functools
 import inspect
 import json
-from typing import Any, Literal
+from typing import Any, Callable, Literal
 from pydantic import BaseModel, create_model
 from enum import Enum
 import yaml
 
 from .agent import ChatAgent
-from .llm import Message
+from .llm import Message, Usage, streaming
 from .prompts import *
-from .utils import generate_pydantic_code
+from .utils import CHARS_PER_TOKEN, chunks, generate_pydantic_code
 from .skills import Skill
 from .tools import Tool
+from .tracing import current_span, span, traced
 
 
 def create_cot_model(name: str, result_cls: type | Enum) -> type[BaseModel]:
@@ -21,13 +26,48 @@ def create_cot_model(name: str, result_cls: type | Enum) -> type[BaseModel]:
     )
 
 
-def create_decide_model():
-    return create_cot_model("Decide", bool)
+def create_direct_model(name: str, result_cls: type | Enum) -> type[BaseModel]:
+    return create_model(
+        name,
+        result=(result_cls, ...),
+    )
+
 
+def create_decide_model(direct: bool = False):
+    return (create_direct_model if direct else create_cot_model)("Decide", bool)
 
-def create_choose_model(choices: list[str]):
+
+def create_choose_model(choices: list[str], direct: bool = False):
     enum_type = Enum("Choices", {c: c for c in choices})
-    return create_cot_model("Choose", enum_type)
+    return (create_direct_model if direct else create_cot_model)("Choose", enum_type)
+
+
+_primitive: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "primitive", default=None
+)
+
+
+def primitive(name: str):
+    """
+    Marks a `Context` method as a primitive, so it is traced
+    and the usage of its LLM calls is accounted to it.
+    """
+
+    def decorator(target):
+        target = traced(f"context.{name}")(target)
+
+        @functools.wraps(target)
+        async def wrapper(*args, **kwargs):
+            token = _primitive.set(name)
+
+            try:
+                return await target(*args, **kwargs)
+            finally:
+                _primitive.reset(token)
+
+        return wrapper
+
+    return decorator
 
 
 class ToolResult(BaseModel):
@@ -40,10 +80,28 @@ class Context:
     def __init__(self, agent: ChatAgent, messages: list[Message]):
         self.agent = agent
         self._messages = messages
+        self._parent: Context | None = None
+        self._base = 0
+        self.skill: Skill | None = None
+        self.usage = Usage()
 
     @property
     def messages(self) -> list[Message]:
-        return list(self._messages)
+        if self._parent is None:
+            return list(self._messages)
+
+        return self._parent.messages[: self._base] + self._messages
+
+    def record(self, usage: Usage):
+        """
+        Accounts the usage of an LLM call to this context,
+        and to the agent under the current skill and primitive.
+        """
+        self.usage.add(usage)
+        self.agent.account(self.skill.name if self.skill else None, _primitive.get(), usage)
+
+    def _direct(self, direct: bool | None) -> bool:
+        return self.agent.direct if direct is None else direct
 
     def _wrap(self, message: Message | str | BaseModel):
         if isinstance(message, Message):
@@ -63,6 +121,7 @@ class Context:
 
         return messages
 
+    @primitive("reply")
     async def reply(
         self, *instructions: str | Message, persistent: bool = True
     ) -> Message:
@@ -72,91 +131,122 @@ class Context:
         It does not use any skills.
         Mostly useful inside skills to finish the conversation.
         """
-        result = await self.agent.llm.chat(self._expand_content(*instructions))
+        result = await self.agent.llm_for("reply").chat(self._expand_content(*instructions))
 
         if persistent:
             self.add(result)
 
         return result
 
-    async def choose[T](self, options: list[T], *instructions: str | Message) -> T:
+    @primitive("choose")
+    async def choose[T](
+        self, options: list[T], *instructions: str | Message, direct: bool | None = None
+    ) -> T:
         """Choose one option out of many.
 
         This method will use the LLM to choose one option out of many.
         It does not use any skills.
         Mostly useful inside skills to make decisions.
+
+        If `direct` is True (by default, the agent's setting), the LLM answers
+        without reasoning first, which is faster but less accurate.
         """
+        direct = self._direct(direct)
         mapping = {str(option): option for option in options}
-        choose_cls = create_choose_model(choices=list(mapping.keys()))
+        choose_cls = create_choose_model(choices=list(mapping.keys()), direct=direct)
 
-        prompt = DEFAULT_CHOOSE_PROMPT.format(
+        prompt = (DIRECT_CHOOSE_PROMPT if direct else DEFAULT_CHOOSE_PROMPT).format(
             options="\n".join([f"- {option}" for option in options]),
             format=choose_cls.model_json_schema(),
         )
 
-        response = await self.agent.llm.create(
+        response = await self.agent.llm_for("choose").create(
             choose_cls, self._expand_content(*instructions, Message.system(prompt))
         )
 
         return mapping[response.result.value]  # type: ignore
 
-    async def decide(self, *instructions) -> bool:
+    @primitive("decide")
+    async def decide(self, *instructions, direct: bool | None = None) -> bool:
         """Decide True or False.
 
         This method will use the LLM to decide True or False.
         It does not use any skills.
         Mostly useful inside skills to make decisions.
+
+        If `direct` is True (by default, the agent's setting), the LLM answers
+        without reasoning first, which is faster but less accurate.
         """
-        decide_cls = create_decide_model()
+        direct = self._direct(direct)
+        decide_cls = create_decide_model(direct=direct)
 
-        prompt = DEFAULT_DECIDE_PROMPT.format(
+        prompt = (DIRECT_DECIDE_PROMPT if direct else DEFAULT_DECIDE_PROMPT).format(
             format=decide_cls.model_json_schema(),
         )
 
-        response = await self.agent.llm.create(
+        response = await self.agent.llm_for("decide").create(
             decide_cls, self._expand_content(*instructions, Message.system(prompt))
         )
 
         return response.result  # type: ignore
 
+    @primitive("equip")
     async def equip(
-        self, *instructions: str | Message, tools: list[Tool] | None = None
+        self,
+        *instructions: str | Message,
+        tools: list[Tool] | None = None,
+        direct: bool | None = None,
     ) -> Tool:
         """Selects one and exactly one tool.
 
         This method will use the LLM to pick a tool from the list of tools.
         It does not use any skills.
         Mostly useful inside skills to make decisions.
+
+        If the agent has a tool index, the tools are first narrowed down
+        to the ones most similar to the conversation.
         """
+        direct = self._direct(direct)
+
         if tools is None:
             tools = self.agent._tools
 
+        # with many tools, only the most relevant ones are shown to the LLM
+        if self.agent.tool_index is not None:
+            query = "\n".join(
+                [self.messages[-1].dump()["content"]]
+                + [self._wrap(i).dump()["content"] for i in instructions]
+            )
+            tools = await self.agent.tool_index.select(tools, query)
+
         tool_str = {tool.name: tool.description for tool in tools}
         mapping = {tool.name: tool for tool in tools}
 
-        model = create_choose_model(list(tool_str.keys()))
+        model = create_choose_model(list(tool_str.keys()), direct=direct)
 
-        prompt = DEFAULT_EQUIP_PROMPT.format(
+        prompt = (DIRECT_EQUIP_PROMPT if direct else DEFAULT_EQUIP_PROMPT).format(
             tools=tool_str,
             format=model.model_json_schema(),
         )
 
-        response = await self.agent.llm.create(
+        response = await self.agent.llm_for("equip").create(
             model, self._expand_content(*instructions, Message.system(prompt))
         )
 
         return mapping[response.result.value]  # type: ignore
 
-    async def engage(self, *instructions: str | Message) -> Skill:
+    @primitive("engage")
+    async def engage(self, *instructions: str | Message, direct: bool | None = None) -> Skill:
         """
         Selects a single skill to respond to the instructions.
         This method will use the LLM to pick a skill from the list of skills.
         """
+        direct = self._direct(direct)
         skills: list[Skill] = self.agent._skills
         skills_map = {s.name: s for s in skills}
-        model = create_choose_model(list(skills_map.keys()))
+        model = create_choose_model(list(skills_map.keys()), direct=direct)
 
-        prompt = DEFAULT_ENGAGE_PROMPT.format(
+        prompt = (DIRECT_ENGAGE_PROMPT if direct else DEFAULT_ENGAGE_PROMPT).format(
             skills="\n".join(
                 [f"- {skill.name}: {skill.description}" for skill in skills]
             ),
@@ -165,9 +255,11 @@ class Context:
 
         messages = self._expand_content(*instructions, Message.system(prompt))
 
-        response = await self.agent.llm.create(model, messages)
+        response = await self.agent.llm_for("engage").create(model, messages)
+        current_span().set(skill=response.result.value)  # type: ignore
         return skills_map[response.result.value]  # type: ignore
 
+    @primitive("invoke")
     async def invoke(
         self,
         tool: Tool | None = None,
@@ -201,12 +293,13 @@ class Context:
 
         messages = self._expand_content(*instructions, Message.system(prompt))
 
-        response: BaseModel = await self.agent.llm.create(
+        response: BaseModel = await self.agent.llm_for("invoke").create(
             model_cls, messages + [Message.system(prompt)]
         )
 
         try:
-            result = await tool.run(**response.model_dump())
+            with span("tool.run", tool=tool.name):
+                result = await tool.run(**response.model_dump())
         except Exception as e:
             if errors == "handle":
                 return ToolResult(tool=tool.name, error=str(e))
@@ -218,6 +311,7 @@ class Context:
             result=result,
         )
 
+    @primitive("create")
     async def create[T: BaseModel](
         self, *instructions: str | Message | BaseModel, model: type[T]
     ) -> T:
@@ -239,8 +333,122 @@ class Context:
             )
         )
 
-        return await self.agent.llm.create(model, messages)
+        return await self.agent.llm_for("create").create(model, messages)
+
+    @primitive("map_reduce")
+    async def map_reduce(
+        self,
+        document: str,
+        map: str,
+        reduce: str,
+        tokens: int = 2000,
+        concurrency: int = 8,
+        fan_in: int = 8,
+        callback: Callable[[str], Any] | None = None,
+        persistent: bool = True,
+    ) -> Message:
+        """
+        Processes a document too long for a single prompt.
+
+        The document is split into chunks of about `tokens` tokens,
+        and the `map` instructions are applied to every chunk concurrently,
+        with at most `concurrency` LLM calls at once.
+        The partial results are then combined with the `reduce` instructions,
+        `fan_in` at a time, until a single reply remains, which is streamed as usual.
+
+        Every intermediate result is sent to `callback` as soon as it is ready.
+        """
+        if fan_in < 2:
+            raise ValueError("fan_in must be at least 2.")
+
+        history = self.messages
+        llm = self.agent.llm_for("map_reduce")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(prompt: str, final: bool = False) -> str:
+            # the history goes first, so every call shares a cacheable prefix
+            messages = history + [Message.system(prompt)]
+
+            async with semaphore:
+                if final:
+                    result = await llm.chat(messages)
+                else:
+                    with streaming(lambda chunk: None):
+                        result = await llm.chat(messages)
+
+            if callback is not None and not final:
+                if inspect.iscoroutinefunction(callback):
+                    await callback(result.content)
+                else:
+                    callback(result.content)
+
+            return result.content
+
+        def reduce_prompt(partials: list[str]) -> str:
+            return DEFAULT_REDUCE_PROMPT.format(
+                instructions=reduce,
+                partials="\n\n---\n\n".join(partials),
+            )
+
+        parts = list(chunks(document, tokens * CHARS_PER_TOKEN)) or [""]
+
+        if len(parts) == 1:
+            content = await run(DEFAULT_MAP_PROMPT.format(instructions=map, chunk=parts[0]), final=True)
+        else:
+            partials = await asyncio.gather(
+                *[run(DEFAULT_MAP_PROMPT.format(instructions=map, chunk=part)) for part in parts]
+            )
+
+            while len(partials) > fan_in:
+                partials = await asyncio.gather(
+                    *[
+                        run(reduce_prompt(partials[i : i + fan_in]))
+                        for i in range(0, len(partials), fan_in)
+                    ]
+                )
+
+            content = await run(reduce_prompt(list(partials)), final=True)
+
+        result = Message.assistant(content)
+
+        if persistent:
+            self.add(result)
+
+        return result
+
+    @primitive("remember")
+    async def remember(self, *documents: str):
+        """
+        Stores documents in the agent's memory, to recall them later.
+        """
+        if self.agent.memory is None:
+            raise TypeError("Memory is not set.")
+
+        await self.agent.memory.remember(*documents)
+
+    @primitive("recall")
+    async def recall(self, query: str | None = None, k: int = 5, persistent: bool = True) -> list[str]:
+        """
+        Retrieves the `k` documents in the agent's memory most relevant to the query
+        (by default, the last message), and adds them to the context.
 
+        Unlike adding every document to the conversation,
+        this keeps only the relevant ones in the prompt.
+        """
+        if self.agent.memory is None:
+            raise TypeError("Memory is not set.")
+
+        if query is None:
+            query = self.messages[-1].dump()["content"]
+
+        documents = [d.text for d in await self.agent.memory.recall(query, k)]
+
+        if persistent and documents:
+            self.add(Message.system(DEFAULT_RECALL_PROMPT.format(documents="\n\n".join(documents))))
+
+        return documents
+
+    @primitive("prompt")
     async def prompt(self):
         """
         Prompts the user for input.
@@ -255,11 +463,17 @@ class Context:
 
         self.add(m)
 
+    @primitive("delegate")
     async def delegate(self, skill: Skill):
         """
         Delegate to another skill.
         """
-        await skill.execute(self)
+        previous, self.skill = self.skill, skill
+
+        try:
+            await skill.execute(self)
+        finally:
+            self.skill = previous
 
     def add(self, *messages: Message | str | BaseModel) -> None:
         """
@@ -267,3 +481,33 @@ class Context:
         """
         for message in messages:
             self._messages.append(self._wrap(message))
+
+    def fork(self) -> "Context":
+        """
+        Creates a child context that sees every message up to this point.
+
+        The history is shared, not copied, and messages added to the child
+        are kept apart from this context and from other children.
+        This allows exploring alternatives concurrently, e.g.:
+
+            drafts = [ctx.fork() for _ in range(3)]
+            await asyncio.gather(*[d.reply() for d in drafts])
+            ctx.join(drafts[0])
+        """
+        child = copy.copy(self)
+        child._parent = self
+        child._base = self._base + len(self._messages)
+        child._messages = []
+        return child
+
+    def join(self, *children: "Context", last: bool = False):
+        """
+        Adds the messages of forked children to this context, in order.
+
+        If `last` is True, only the final message of each child is added.
+        """
+        for child in children:
+            if child._parent is not self:
+                raise ValueError("Only children forked from this context can be joined.")
+
+            self._messages.extend(child._messages[-1:] if last else child._messages)
@@ -1,6 +1,14 @@
 import abc
 import asyncio
+import collections
+import itertools
+import os
+import pickle
 import threading
+import time
+from typing import Any, Callable, Hashable
+
+from pydantic import BaseModel
 
 from .agent import Agentic
 from .llm import Message
@@ -22,26 +30,288 @@ class MessageBoard(abc.ABC):
     async def post[T](self, message: T):
         pass
 
+    def subscribe(self, message_type: type, subscriber: str, workers: int = 1):
+        """
+        Declares that `subscriber` listens to messages of `message_type` with a number of workers.
+
+        Boards that support routing deliver a copy of each message to every subscriber.
+        By default, subscriptions are ignored and all listeners of a type share its messages.
+        """
+        pass
+
+    async def receive[T](self, message_type: type[T], subscriber: str, worker: int = 0) -> T:
+        """
+        Gets the next message for one worker of a subscriber.
+        """
+        return await self.get(message_type)
+
+    async def ack(self, message):
+        """
+        Confirms that a received message was processed.
+
+        Boards that redeliver unconfirmed messages (e.g., after a crash) keep them,
+        and count them as pending, until they are acknowledged. By default, it does nothing.
+        """
+        pass
+
+    async def release(self, message):
+        """
+        Gives back a received message that won't be processed (e.g., its worker was cancelled),
+        so it can be received again. By default, it does nothing.
+        """
+        pass
+
+    async def size(self, message_type: type, subscriber: str | None = None) -> int:
+        """
+        Returns the number of messages of a given type waiting to be processed.
+        """
+        raise NotImplementedError()
+
+    def snapshot(self) -> list[tuple]:
+        """
+        Returns all pending messages as `(message_type, subscriber, priority, key, message)` tuples,
+        without removing them from the board. This includes received messages that were
+        not acknowledged yet, but not messages that no one subscribes to.
+        """
+        raise NotImplementedError()
+
+    def restore(self, entries: list[tuple]):
+        """
+        Puts back messages returned by `snapshot`.
+        """
+        raise NotImplementedError()
+
+
+class Subscription:
+    """
+    The queues of one subscriber to a message type.
+
+    Partitioned subscriptions have one queue per worker, and messages
+    with the same partition key always go to the same queue, so they are
+    processed in order while different keys are processed in parallel.
+    """
+
+    def __init__(self, workers: int, partitioned: bool, maxsize: int):
+        self.queues = [
+            asyncio.PriorityQueue(maxsize) for _ in range(workers if partitioned else 1)
+        ]
+        self.backlog: collections.deque = collections.deque()
+        self._next = 0
+
+    def refill(self):
+        """Moves messages from the backlog into the queues while there is room."""
+        while self.backlog:
+            entry = self.backlog[0]
+
+            try:
+                self.queue(entry[2]).put_nowait(entry)
+            except asyncio.QueueFull:
+                break
+
+            self.backlog.popleft()
+
+    def queue(self, key) -> asyncio.PriorityQueue:
+        if len(self.queues) == 1:
+            return self.queues[0]
+
+        if key is None:
+            # messages without key are spread round-robin
+            self._next = (self._next + 1) % len(self.queues)
+            return self.queues[self._next]
+
+        return self.queues[hash(key) % len(self.queues)]
+
+    def size(self) -> int:
+        return sum(q.qsize() for q in self.queues) + len(self.backlog)
+
+    def entries(self) -> list[tuple]:
+        """Returns all pending entries without removing them."""
+        entries = list(self.backlog)
+
+        for q in self.queues:
+            items = [q.get_nowait() for _ in range(q.qsize())]
+
+            for item in items:
+                q.put_nowait(item)
+
+            entries.extend(items)
+
+        return sorted(entries, key=lambda e: e[:2])
+
 
 class MemoryBoard(MessageBoard):
     """
     A simple in-memory message board that uses asyncio queues.
+
+    Messages are delivered to every subscriber of their type or any of its base types,
+    with routes resolved once per message type and cached, so posting is a dictionary lookup.
+    Within a subscriber, higher priority messages are received first.
+
+    If `maxsize` is given, queues are bounded and `post` waits
+    until there is room, which applies backpressure to producers.
+
+    If `partition` is given, it computes a key for each message (e.g., a conversation id)
+    and subscribers with several workers get messages with the same key in order.
+    If `priority` is given, it computes the default priority of each message.
+
+    Messages of types nobody subscribes to (e.g., the final results of a crew) aren't pending work:
+    only the last `orphans` of them are kept, and delivered to the first subscriber of their type.
     """
 
-    def __init__(self):
-        self.queues: dict[type, asyncio.Queue] = {}
+    def __init__(
+        self,
+        maxsize: int = 0,
+        partition: Callable[[Any], Hashable] | None = None,
+        priority: Callable[[Any], int] | None = None,
+        orphans: int = 100,
+    ):
+        self.maxsize = maxsize
+        self.partition = partition
+        self.priority = priority
+        self.subscriptions: dict[type, dict[str | None, Subscription]] = {}
+        self._routes: dict[type, list[Subscription]] = {}
+        self._orphans: collections.deque = collections.deque(maxlen=orphans)
+        # the last message received by each worker, until it is acknowledged
+        self._received: dict[tuple, tuple] = {}
+        self._seq = itertools.count()
+
+    def subscribe(self, message_type: type, subscriber: str | None, workers: int = 1):
+        subscriptions = self.subscriptions.setdefault(message_type, {})
+
+        if subscriber in subscriptions:
+            return
+
+        subscriptions[subscriber] = subscription = Subscription(
+            workers, self.partition is not None, self.maxsize
+        )
+        self._routes.clear()
+
+        # deliver messages posted before anyone listened to them
+        for entry in list(self._orphans):
+            if isinstance(entry[-1], message_type):
+                self._orphans.remove(entry)
+                subscription.backlog.append(entry)
+
+        subscription.refill()
+
+    def _route(self, message_type: type) -> list[Subscription]:
+        routes = self._routes.get(message_type)
+
+        if routes is None:
+            routes = self._routes[message_type] = [
+                subscription
+                for t in message_type.__mro__
+                for subscription in self.subscriptions.get(t, {}).values()
+            ]
+
+        return routes
 
     async def get[T](self, message_type: type[T]) -> T:
-        if message_type not in self.queues:
-            self.queues[message_type] = asyncio.Queue()
+        return await self.receive(message_type, None)  # type: ignore
 
-        return await self.queues[message_type].get()
+    async def receive[T](self, message_type: type[T], subscriber: str | None, worker: int = 0) -> T:
+        if subscriber not in self.subscriptions.get(message_type, {}):
+            self.subscribe(message_type, subscriber)
 
-    async def post[T](self, message: T):
-        if type(message) not in self.queues:
-            self.queues[type(message)] = asyncio.Queue()
+        subscription = self.subscriptions[message_type][subscriber]
+        subscription.refill()
+        entry = await subscription.queues[worker % len(subscription.queues)].get()
+        self._received[(message_type, subscriber, worker)] = entry
+        return entry[-1]
+
+    def _unreceive(self, message) -> tuple | None:
+        for slot, entry in self._received.items():
+            if entry[-1] is message:
+                del self._received[slot]
+                return slot, entry
+
+        return None
+
+    async def ack(self, message):
+        self._unreceive(message)
+
+    async def release(self, message):
+        received = self._unreceive(message)
+
+        if received is not None:
+            (message_type, subscriber, _), entry = received
+            # it keeps its priority and place in line
+            subscription = self.subscriptions[message_type][subscriber]
+            subscription.backlog.appendleft(entry)
+            subscription.refill()
+
+    async def post[T](self, message: T, priority: int | None = None, key: Hashable | None = None):
+        if priority is None:
+            priority = self.priority(message) if self.priority else 0
+        if key is None and self.partition is not None:
+            key = self.partition(message)
+
+        # higher priorities first, then by order of arrival
+        entry = (-priority, next(self._seq), key, message)
+        routes = self._route(type(message))
+
+        if not routes:
+            self._orphans.append(entry)
 
-        await self.queues[type(message)].put(message)
+        for subscription in routes:
+            await subscription.queue(key).put(entry)
+
+    async def size(self, message_type: type, subscriber: str | None = None) -> int:
+        subscriptions = self.subscriptions.get(message_type, {})
+
+        if subscriber is not None:
+            return subscriptions[subscriber].size() if subscriber in subscriptions else 0
+
+        return sum(s.size() for s in subscriptions.values())
+
+    def snapshot(self) -> list[tuple]:
+        # unrouted messages are left out, as nothing would process them
+        entries = [
+            (message_type, subscriber, entry)
+            for message_type, subscriptions in self.subscriptions.items()
+            for subscriber, subscription in subscriptions.items()
+            for entry in subscription.entries()
+        ]
+        entries += [
+            (message_type, subscriber, entry)
+            for (message_type, subscriber, _), entry in self._received.items()
+        ]
+        # in order of priority and arrival, so they are restored in the same order
+        entries.sort(key=lambda e: e[2][:2])
+
+        return [
+            (message_type, subscriber, -priority, key, message)
+            for message_type, subscriber, (priority, _, key, message) in entries
+        ]
+
+    def restore(self, entries: list[tuple]):
+        for message_type, subscriber, priority, key, message in entries:
+            if subscriber is None and message_type not in self.subscriptions:
+                self._orphans.append((-priority, next(self._seq), key, message))
+                continue
+
+            self.subscribe(message_type, subscriber)
+            subscription = self.subscriptions[message_type][subscriber]
+            subscription.backlog.append((-priority, next(self._seq), key, message))
+            subscription.refill()
+
+
+class AgentStats(BaseModel):
+    """
+    Runtime metrics for the workers of a single agent in a crew.
+    """
+
+    agent: str
+    workers: int
+    depth: int | None = None
+    busy: int = 0
+    processed: int = 0
+    total_latency: float = 0
+    max_latency: float = 0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.processed if self.processed else 0
 
 
 class Crew:
@@ -53,51 +323,282 @@ class Crew:
 
     The crew will post messages to the message board that will be automatically
     picked up by the right agent if such agent exists.
+
+    Each agent can run several concurrent workers, as configured by `workers`,
+    either as a single number for all agents or as a mapping from input type to number.
+    Workers of the same agent share its instance, unless the agent is given
+    as a factory (e.g., the agent class or a lambda) in which case each worker
+    gets its own instance, which is useful for agents that keep state.
+
+    If `checkpoint` is given, the pending and in-flight messages are periodically
+    saved to that file (every `checkpoint_interval` seconds, and when the crew stops),
+    and restored instead of the seed when the crew starts again.
+    This requires a board that supports `snapshot` and `restore`.
     """
 
-    def __init__(self, board: MessageBoard, agents: list[Agentic], seed:list=None):
+    def __init__(
+        self,
+        board: MessageBoard,
+        agents: list[Agentic | Callable[[], Agentic]],
+        seed: list | None = None,
+        workers: int | dict[type, int] = 1,
+        checkpoint: str | None = None,
+        checkpoint_interval: float = 60,
+    ):
         self.agents = agents
         self.board = board
         self.seed = seed or []
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.stats: dict[str, AgentStats] = {}
+        self._types: dict[str, type] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._in_flight: dict[tuple[str, int], tuple] = {}
+        self._stopping = False
+        self._stopped = asyncio.Event()
+
+    def _workers_for(self, message_type: type) -> int:
+        if isinstance(self.workers, int):
+            return self.workers
+
+        return self.workers.get(message_type, 1)
+
+    def _instances(self, agent) -> list[Agentic]:
+        # agents are instances with a `perform` method, anything else callable is a factory
+        if isinstance(agent, type) or not hasattr(agent, "perform"):
+            first = agent()
+            in_t, _ = first.types
+            return [first] + [agent() for _ in range(self._workers_for(in_t) - 1)]
+
+        in_t, _ = agent.types
+        return [agent] * self._workers_for(in_t)
+
+    async def metrics(self) -> dict[str, AgentStats]:
+        """
+        Returns the current metrics for each agent, including the depth of its queue
+        when the board supports it.
+        """
+        for name, stats in self.stats.items():
+            try:
+                stats.depth = await self.board.size(self._types[name], name)
+            except NotImplementedError:
+                stats.depth = None
+
+        return dict(self.stats)
+
+    async def idle(self) -> bool:
+        """
+        Returns whether no agent is processing a message and all queues are empty.
+        """
+        if self._in_flight:
+            return False
+
+        for name, message_type in self._types.items():
+            try:
+                if await self.board.size(message_type, name):
+                    return False
+            except NotImplementedError:
+                raise TypeError(
+                    f"{type(self.board).__name__} doesn't implement `size`, "
+                    "so the crew can't tell when it's idle."
+                ) from None
+
+        return True
+
+    async def wait_idle(self, poll_interval: float = 0.05):
+        """
+        Waits until the crew is idle.
+        """
+        while not await self.idle():
+            await asyncio.sleep(poll_interval)
+
+    async def stop(self, drain: bool = True, timeout: float | None = None):
+        """
+        Stops the crew loop.
 
+        If `drain` is True, waits (up to `timeout` seconds) until all pending messages
+        are processed. Then cancels all workers, interrupting any in-flight `perform`.
+        Interrupted messages are kept in the final checkpoint, if any.
+        Draining requires a board that implements `size`, but the workers
+        are cancelled even if it doesn't.
+        """
+        if not self._tasks or self._stopped.is_set():
+            return
+
+        try:
+            if drain:
+                try:
+                    await asyncio.wait_for(self.wait_idle(), timeout)
+                except TimeoutError:
+                    pass
+        finally:
+            self._stopping = True
+
+            for task in self._tasks:
+                task.cancel()
+
+            await self._stopped.wait()
 
-    async def loop(self):
+    def save_checkpoint(self):
+        """
+        Saves pending and in-flight messages (as reported by the board's `snapshot`)
+        to the checkpoint file. If there are none, the file is removed,
+        so the next run starts from its seed.
+        """
+        if self.checkpoint is None:
+            return
+
+        entries = self.board.snapshot()
+
+        if not entries:
+            if os.path.exists(self.checkpoint):
+                os.remove(self.checkpoint)
+
+            return
+
+        with open(self.checkpoint + ".tmp", "wb") as fp:
+            pickle.dump(entries, fp)
+
+        os.replace(self.checkpoint + ".tmp", self.checkpoint)
+
+    def _load_checkpoint(self) -> bool:
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return False
+
+        with open(self.checkpoint, "rb") as fp:
+            entries = pickle.load(fp)
+
+        # an empty checkpoint means the previous run finished its work
+        if not entries:
+            return False
+
+        self.board.restore(entries)
+        return True
+
+    async def _checkpoint_loop(self):
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            self.save_checkpoint()
+
+    async def _stop_when_idle(self):
+        try:
+            await self.wait_idle()
+        except Exception:
+            self._stopping = True
+
+            for task in self._tasks:
+                task.cancel()
+
+            raise
+
+        await self.stop(drain=False)
+
+    async def loop(self, until_idle: bool = False):
         """
         Starts the crew loop.
 
         This method blocks in the current thread and must be called
         from an async context.
 
+        If `until_idle` is True, the loop finishes as soon as all messages are processed,
+        which is useful for batch crews. Otherwise it runs until `stop()` is called.
+
         Use `start()` if you want to run the loop in a background thread.
         """
-        for item in self.seed:
-            await self.board.post(item)
+        workers = []
+        self._in_flight.clear()
+        self._stopping = False
+        self._stopped.clear()
+
+        for agent in self.agents:
+            instances = self._instances(agent)
+            in_t, _ = instances[0].types
+            stats = AgentStats(agent=instances[0].name, workers=len(instances))
+            self.stats[stats.agent] = stats
+            self._types[stats.agent] = in_t
+            self.board.subscribe(in_t, stats.agent, len(instances))
+            workers.extend(
+                self._loop_agent(instance, stats, worker)
+                for worker, instance in enumerate(instances)
+            )
+
+        # start consuming before seeding, so bounded queues don't block the seed
+        self._tasks = [asyncio.create_task(w) for w in workers]
+        helpers = []
 
         try:
-            await asyncio.gather(*[self._loop_agent(agent) for agent in self.agents])
+            if not self._load_checkpoint():
+                for item in self.seed:
+                    await self.board.post(item)
+
+            if self.checkpoint is not None:
+                helpers.append(asyncio.create_task(self._checkpoint_loop()))
+            if until_idle:
+                helpers.append(asyncio.create_task(self._stop_when_idle()))
+
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            # workers cancelled by `stop()` are a normal termination
+            if not self._stopping or asyncio.current_task().cancelling():  # type: ignore
+                raise
         except KeyboardInterrupt:
             pass
+        finally:
+            for task in self._tasks + helpers:
+                task.cancel()
 
-    def start(self):
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            results = await asyncio.gather(*helpers, return_exceptions=True)
+            self.save_checkpoint()
+            self._stopped.set()
+
+        # e.g., `until_idle` with a board that can't report its size
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    def start(self, until_idle: bool = False):
         """
         Runs `loop()` as a background async task and returns the task.
         """
-        return asyncio.create_task(self.loop())
+        return asyncio.create_task(self.loop(until_idle))
 
-    async def _loop_agent(self, agent: Agentic):
+    async def _loop_agent(self, agent: Agentic, stats: AgentStats | None = None, worker: int = 0):
         """
-        Starts the loop for a single agent.
+        Starts the loop for a single worker of an agent.
         """
         in_t, out_t = agent.types
+        stats = stats or AgentStats(agent=agent.name, workers=1)
 
         while True:
-            m = await self.board.get(in_t)
+            message = await self.board.receive(in_t, agent.name, worker)
+            self._in_flight[(agent.name, worker)] = (in_t, agent.name, message)
+            start = time.perf_counter()
+            stats.busy += 1
+
+            try:
+                async for m in agent.perform(Message.system(message)):
+                    await self.board.post(m.content)
+            except asyncio.CancelledError:
+                # the board gets it back, so it can be received again or checkpointed
+                await self.board.release(message)
+                raise
+            finally:
+                latency = time.perf_counter() - start
+                stats.busy -= 1
+                stats.processed += 1
+                stats.total_latency += latency
+                stats.max_latency = max(stats.max_latency, latency)
+
+            # outputs were already posted, so the crew is never seen idle in between
+            await self.board.ack(message)
 
-            async for m in agent.perform(Message.system(m)):
-                await self.board.post(m.content)
+            # interrupted messages never get here, so the crew isn't seen idle without them
+            del self._in_flight[(agent.name, worker)]
 
-    def run(self):
+    def run(self, until_idle: bool = False):
         """
         Blocks the current thread until the crew loop is stopped.
         """
-        asyncio.run(self.loop())
+        asyncio.run(self.loop(until_idle))
@@ -1,5 +1,10 @@
 import abc
-from typing import Annotated, Any, Callable, Coroutine, Union
+import asyncio
+import importlib
+import inspect
+import os
+from typing import Annotated, Any, Callable, Coroutine, Literal, Union
+import rich
 import yaml
 
 from pydantic import BaseModel, Discriminator, Field, RootModel, Tag, model_validator
@@ -16,25 +21,50 @@ PREDEFINED_SKILLS = {
 }
 
 
+def import_object(path: str) -> Any:
+    """
+    Imports an object from a path like `package.module:name` (or `package.module.name`).
+    """
+    module, _, name = path.rpartition(":") if ":" in path else path.rpartition(".")
+
+    if not module:
+        raise ValueError(f"Invalid import path: {path}")
+
+    return getattr(importlib.import_module(module), name)
+
+
 class ToolConfig(BaseModel):
     name: str
-    description: str
+    function: str
+    description: str | None = None
+
+    def compile(self, agent: ChatAgent) -> Tool:
+        tool = agent.tool(import_object(self.function), name=self.name, description=self.description)
+        tool.config = self  # type: ignore
+        return tool
 
 
 class SkillStep(BaseModel):
     @abc.abstractmethod
-    def compile(self) -> Callable[[Context], Coroutine[Any, Any, None]]:
+    def compile(self, tools: dict[str, Tool]) -> Callable[[Context], Coroutine[Any, Any, None]]:
         pass
 
+    def uses_tools(self) -> set[str]:
+        """The names of the tools this step (or any nested step) invokes."""
+        return set()
+
 
 class DecideStep(SkillStep):
     decide: str | None
     yes: "StepList"
     no: "StepList"
 
-    def compile(self):
-        true_branch = self.yes.compile()
-        false_branch = self.no.compile()
+    def uses_tools(self):
+        return self.yes.uses_tools() | self.no.uses_tools()
+
+    def compile(self, tools):
+        true_branch = self.yes.compile(tools)
+        false_branch = self.no.compile(tools)
 
         async def decide_step(ctx: Context):
             instructions = []
@@ -64,8 +94,11 @@ class ChooseStep(SkillStep):
 
         return data
 
-    def compile(self):
-        compiled_choices = {k: v.compile() for k, v in self.choices.items()}
+    def uses_tools(self):
+        return set().union(*(steps.uses_tools() for steps in self.choices.values()))
+
+    def compile(self, tools):
+        compiled_choices = {k: v.compile(tools) for k, v in self.choices.items()}
 
         async def choose_step(ctx: Context):
             instructions = []
@@ -90,8 +123,11 @@ class WhileStep(SkillStep):
 
         return data
 
-    def compile(self):
-        compiled_steps = self.steps.compile()
+    def uses_tools(self):
+        return self.steps.uses_tools()
+
+    def compile(self, tools):
+        compiled_steps = self.steps.compile(tools)
 
         async def while_step(ctx: Context):
             await compiled_steps(ctx)
@@ -113,8 +149,11 @@ class UntilStep(SkillStep):
 
         return data
 
-    def compile(self):
-        compiled_steps = self.steps.compile()
+    def uses_tools(self):
+        return self.steps.uses_tools()
+
+    def compile(self, tools):
+        compiled_steps = self.steps.compile(tools)
 
         async def until_step(ctx: Context):
             await compiled_steps(ctx)
@@ -128,7 +167,7 @@ class UntilStep(SkillStep):
 class ReplyStep(SkillStep):
     reply: str | None
 
-    def compile(self):
+    def compile(self, tools):
         async def reply_step(ctx: Context):
             instructions = []
 
@@ -140,6 +179,58 @@ class ReplyStep(SkillStep):
         return reply_step
 
 
+class InvokeStep(SkillStep):
+    invoke: str
+    instructions: str | None = None
+    defaults: dict[str, Any] = Field(default_factory=dict)
+    errors: Literal["raise", "handle"] = "raise"
+
+    def uses_tools(self):
+        return {self.invoke}
+
+    def compile(self, tools):
+        if self.invoke not in tools:
+            raise ValueError(f"Unknown tool: {self.invoke}")
+
+        tool = tools[self.invoke]
+        instructions = [Message.system(self.instructions)] if self.instructions else []
+
+        async def invoke_step(ctx: Context):
+            result = await ctx.invoke(tool, *instructions, errors=self.errors, **self.defaults)
+            ctx.add(result)
+
+        return invoke_step
+
+
+class CreateStep(SkillStep):
+    create: str
+    instructions: str | None = None
+
+    def compile(self, tools):
+        model = import_object(self.create)
+        instructions = [Message.system(self.instructions)] if self.instructions else []
+
+        async def create_step(ctx: Context):
+            ctx.add(await ctx.create(*instructions, model=model))
+
+        return create_step
+
+
+class CallStep(SkillStep):
+    call: str
+
+    def compile(self, tools):
+        function = import_object(self.call)
+
+        if not inspect.iscoroutinefunction(function):
+            raise ValueError(f"{self.call} must be a coroutine function.")
+
+        async def call_step(ctx: Context):
+            await function(ctx)
+
+        return call_step
+
+
 def get_skill_step_discriminator_value(v: Any) -> str:
     if isinstance(v, SkillStep):
         return v.__class__.__name__
@@ -154,6 +245,12 @@ def get_skill_step_discriminator_value(v: Any) -> str:
             return "WhileStep"
         elif "until" in v:
             return "UntilStep"
+        elif "invoke" in v:
+            return "InvokeStep"
+        elif "create" in v:
+            return "CreateStep"
+        elif "call" in v:
+            return "CallStep"
 
     raise ValueError(f"Invalid SkillStep: {v}")
 
@@ -168,6 +265,9 @@ class StepList(
                     Annotated[ReplyStep, Tag("ReplyStep")],
                     Annotated[WhileStep, Tag("WhileStep")],
                     Annotated[UntilStep, Tag("UntilStep")],
+                    Annotated[InvokeStep, Tag("InvokeStep")],
+                    Annotated[CreateStep, Tag("CreateStep")],
+                    Annotated[CallStep, Tag("CallStep")],
                 ],
                 Discriminator(get_skill_step_discriminator_value),
             ]
@@ -176,8 +276,11 @@ class StepList(
 ):
     pass
 
-    def compile(self):
-        steps = [s.compile() for s in self.root]
+    def uses_tools(self) -> set[str]:
+        return set().union(*(s.uses_tools() for s in self.root))
+
+    def compile(self, tools):
+        steps = [s.compile(tools) for s in self.root]
 
         async def step_list(ctx: Context):
             for step in steps:
@@ -191,14 +294,18 @@ class SkillConfig(BaseModel):
     description: str
     steps: StepList
 
-    def compile(self) -> Skill:
-        return DeclarativeSkill(self)
+    def compile(self, tools: dict[str, Tool] | None = None) -> Skill:
+        return DeclarativeSkill(self, tools or {})
 
 
 class DeclarativeSkill(Skill):
-    def __init__(self, config: SkillConfig):
+    def __init__(self, config: SkillConfig, tools: dict[str, Tool]):
         super().__init__(config.name, config.description)
-        self.steps = config.steps.compile()
+        self.config = config
+        # tools are resolved once here, so steps call them directly
+        self.steps = config.steps.compile(tools)
+        # only the tools the steps invoke, so unrelated tools don't force a recompile
+        self.tools = {name: tools[name] for name in config.steps.uses_tools()}
 
     async def execute(self, ctx):
         await self.steps(ctx)
@@ -208,22 +315,111 @@ class AgentConfig(BaseModel):
     name: str
     description: str
 
+    models: dict[str, str] = Field(default_factory=dict)
+    direct: bool = False
     tools: list[ToolConfig] = Field(default_factory=list)
     skills: list[SkillConfig | str]
 
     def compile(self, llm: LLM) -> ChatAgent:
-        agent = ChatAgent(name=self.name, description=self.description, llm=llm)
+        # other models are served by the same endpoint as the main one
+        models = {primitive: llm.with_model(model) for primitive, model in self.models.items()}
+        agent = ChatAgent(
+            name=self.name,
+            description=self.description,
+            llm=llm,
+            models=models,
+            direct=self.direct,
+        )
+
+        tools = {t.name: t.compile(agent) for t in self.tools}
 
         for s in self.skills:
             if isinstance(s, str):
-                skill = PREDEFINED_SKILLS[s]
+                skill = _skill_function(s)
             else:
-                skill = s.compile()
+                skill = s.compile(tools)
 
             agent.skill(skill)
 
         return agent
 
+    def update(self, agent: ChatAgent) -> list[str]:
+        """
+        Applies this configuration to an agent compiled from a previous version.
+
+        Only skills whose configuration changed are compiled again. The new skill
+        table replaces the old one in a single assignment, so turns in progress
+        finish with the skills they already selected.
+
+        Returns the names of the recompiled skills.
+        """
+        current = {skill.name: skill for skill in agent.skills}
+        previous = agent._tools
+        agent._tools = []
+
+        try:
+            tools = {
+                t.name: self._reuse_tool(agent, previous, t) or t.compile(agent)
+                for t in self.tools
+            }
+        except Exception:
+            agent._tools = previous
+            raise
+
+        skills = []
+        compiled = []
+
+        try:
+            for s in self.skills:
+                if isinstance(s, str):
+                    target = _skill_function(s)
+                    skill = current.get(target.__name__)
+
+                    if skill is None or isinstance(skill, DeclarativeSkill):
+                        skill = agent._skill_cls(target.__name__, inspect.getdoc(target) or "", target)
+
+                    skills.append(skill)
+                elif self._reusable(current.get(s.name), s, tools):
+                    skills.append(current[s.name])
+                else:
+                    skills.append(s.compile(tools))
+                    compiled.append(s.name)
+        except Exception:
+            agent._tools = previous
+            raise
+
+        agent._skills = skills
+        agent._models = {
+            primitive: agent.llm.with_model(model) for primitive, model in self.models.items()
+        }
+        agent._direct = self.direct
+        return compiled
+
+    @staticmethod
+    def _reuse_tool(agent: ChatAgent, previous: list[Tool], config: ToolConfig) -> Tool | None:
+        for tool in previous:
+            if getattr(tool, "config", None) == config:
+                return agent.tool(tool)
+
+        return None
+
+    @staticmethod
+    def _reusable(skill: Skill | None, config: SkillConfig, tools: dict[str, Tool]) -> bool:
+        # a skill is recompiled if its steps changed, or if any tool they invoke changed
+        return (
+            isinstance(skill, DeclarativeSkill)
+            and skill.config == config
+            and all(tools.get(name) is tool for name, tool in skill.tools.items())
+        )
+
+
+def _skill_function(name: str):
+    """Resolves a predefined skill by name, or a Python skill by import path."""
+    if name in PREDEFINED_SKILLS:
+        return PREDEFINED_SKILLS[name]
+
+    return import_object(name)
+
 
 def _fix_dumb_yes_no(item):
     def f(x):
@@ -246,3 +442,39 @@ def parse(path) -> AgentConfig:
         config = yaml.safe_load(fp)
         config = _fix_dumb_yes_no(config)
         return AgentConfig(**config) # type: ignore
+
+
+async def watch(
+    path, agent: ChatAgent, interval: float = 1.0, on_reload: Callable[[], Any] | None = None
+):
+    """
+    Polls a YAML file and updates the agent whenever it changes,
+    then calls `on_reload` (e.g., to update the server's routes).
+
+    Invalid configurations are reported and ignored, so the agent
+    keeps running with the last valid version.
+    """
+    def version():
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    last = version()
+
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            current = version()
+
+            if current == last:
+                continue
+
+            last = current
+            compiled = parse(path).update(agent)
+
+            if on_reload is not None:
+                on_reload()
+
+            rich.print(f"[green]Reloaded {path}[/green] (recompiled: {', '.join(compiled) or 'none'})")
+        except Exception as e:
+            rich.print(f"[red]Failed to reload {path}: {e}[/red]")
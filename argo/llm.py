@@ -1,11 +1,19 @@
 import os
+import copy
+import contextlib
+import contextvars
 import functools
 import inspect
-from typing import Any, Callable, Literal
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Literal
 
 import rich
-import openai
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
+
+from .tracing import span
+
+if TYPE_CHECKING:
+    from .backends import LLMBackend
+    from .cassette import Cassette
 
 
 class Message(BaseModel):
@@ -48,6 +56,80 @@ class Message(BaseModel):
         raise TypeError(f"Cannot unpack {self.content} into {t}")
 
 
+_stream_callback: contextvars.ContextVar[Callable[[str], Any] | None] = (
+    contextvars.ContextVar("stream_callback", default=None)
+)
+
+
+@contextlib.contextmanager
+def streaming(callback: Callable[[str], Any]):
+    """
+    Sends every chunk generated by any `LLM` in the current context to `callback`,
+    instead of the LLM's own callback.
+
+    Unlike `LLM.callback`, this is scoped to the current task,
+    so concurrent requests sharing the same LLM can each stream their own output.
+    """
+    token = _stream_callback.set(callback)
+
+    try:
+        yield
+    finally:
+        _stream_callback.reset(token)
+
+
+class Usage(BaseModel):
+    """Token counts of one or more LLM calls."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+    @computed_field
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    @classmethod
+    def from_api(cls, usage) -> "Usage":
+        """Converts the usage reported by the OpenAI API."""
+        details = getattr(usage, "prompt_tokens_details", None)
+
+        return cls(
+            calls=1,
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=getattr(usage, "completion_tokens", None) or 0,
+            cached_tokens=getattr(details, "cached_tokens", None) or 0,
+        )
+
+    def add(self, other: "Usage"):
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_tokens += other.cached_tokens
+
+
+_usage_recorders: contextvars.ContextVar[tuple[Callable[[Usage], Any], ...]] = (
+    contextvars.ContextVar("usage_recorders", default=())
+)
+
+
+@contextlib.contextmanager
+def recording(callback: Callable[[Usage], Any]):
+    """
+    Sends the usage of every LLM call in the current context to `callback`.
+
+    Scopes can be nested, and every enclosing callback receives each call's usage.
+    """
+    token = _usage_recorders.set(_usage_recorders.get() + (callback,))
+
+    try:
+        yield
+    finally:
+        _usage_recorders.reset(token)
+
+
 class LLM:
     def __init__(
         self,
@@ -56,67 +138,126 @@ class LLM:
         verbose: bool = False,
         base_url: str | None = None,
         api_key: str | None = None,
+        stream_usage: bool = True,
+        cassette: "Cassette | None" = None,
+        backend: "LLMBackend | None" = None,
         **extra_kwargs,
     ):
         self.model = model
         self.verbose = verbose
 
-        if base_url is None:
-            base_url = os.getenv("BASE_URL")
-        if api_key is None:
-            api_key = os.getenv("API_KEY")
+        if backend is None:
+            from .backends import OpenAIBackend
+
+            if base_url is None:
+                base_url = os.getenv("BASE_URL")
+            if api_key is None:
+                api_key = os.getenv("API_KEY")
+
+            backend = OpenAIBackend(base_url=base_url, api_key=api_key)
 
-        self.client = openai.AsyncOpenAI(base_url=base_url, api_key=api_key)
+        self.backend = backend
         self.callback = callback
+        self.stream_usage = stream_usage
+        self.cassette = cassette
         self.extra_kwargs = extra_kwargs
+        self.usage = Usage()
 
-    async def complete(self, prompt: str, **kwargs) -> str:
-        """Low-level method for one-shot completion with the LLM."""
-        result = []
+    def with_model(self, model: str) -> "LLM":
+        """
+        Returns a copy of this LLM that uses another model on the same endpoint,
+        sharing its backend and settings but with its own usage totals.
+        """
+        llm = copy.copy(self)
+        llm.model = model
+        llm.usage = Usage()
+        return llm
+
+    async def _emit(self, content: str):
+        callback = _stream_callback.get() or self.callback
+
+        if callback is None:
+            return
+
+        if inspect.iscoroutinefunction(callback):
+            await callback(content)
+        else:
+            callback(content)
+
+    def _record(self, usage: Usage, span):
+        self.usage.add(usage)
+        span.set(**usage.model_dump(exclude={"calls"}))
+
+        for callback in _usage_recorders.get():
+            callback(usage)
 
-        async for chunk in await self.client.completions.create(
-            model=self.model,
-            prompt=prompt,
-            stream=True,
-            **(kwargs | self.extra_kwargs),
-        ):
-            content = chunk.choices[0].text
+    def _stream_options(self) -> dict:
+        # not every OpenAI-compatible server supports usage in streamed responses
+        return dict(stream_options=dict(include_usage=True)) if self.stream_usage else {}
 
-            if content is None:
+    async def _stream(self, events: AsyncIterator[str | Usage], span) -> list[str]:
+        """Emits and collects the chunks of a streamed response."""
+        result = []
+
+        async for event in events:
+            if isinstance(event, Usage):
+                self._record(event, span)
                 continue
 
-            if self.callback:
-                if inspect.iscoroutinefunction(self.callback):
-                    await self.callback(content)
-                else:
-                    self.callback(content)
+            if not result:
+                span.set(time_to_first_token=span.elapsed())
+
+            await self._emit(event)
+            result.append(event)
+
+        span.set(chunks=len(result))
+        return result
+
+    def _complete_events(self, prompt: str, kwargs: dict) -> AsyncIterator[str | Usage]:
+        return self.backend.complete(self.model, prompt, kwargs)
+
+    def _chat_events(self, payload: list[dict], kwargs: dict) -> AsyncIterator[str | Usage]:
+        return self.backend.chat(self.model, payload, kwargs)
 
-            result.append(content)
+    async def _parse[T: BaseModel](
+        self, model: type[T], payload: list[dict], kwargs: dict
+    ) -> tuple[T | None, Usage | None]:
+        return await self.backend.parse(self.model, model, payload, kwargs)
+
+    async def complete(self, prompt: str, **kwargs) -> str:
+        """Low-level method for one-shot completion with the LLM."""
+        kwargs = self._stream_options() | kwargs | self.extra_kwargs
+
+        with span("llm.complete", model=self.model) as s:
+            if self.cassette is None:
+                events = self._complete_events(prompt, kwargs)
+            else:
+                events = self.cassette.stream(
+                    ("complete", self.model, prompt, kwargs),
+                    lambda: self._complete_events(prompt, kwargs),
+                )
+
+            result = await self._stream(events, s)
 
         return "".join(result)
 
     async def chat(self, messages: list[Message], **kwargs) -> Message:
         """Invoke chat completion on the LLM and return the assistant message."""
-        result = []
+        kwargs = self._stream_options() | kwargs | self.extra_kwargs
 
-        async for chunk in await self.client.chat.completions.create(
-            model=self.model,
-            messages=[message.dump() for message in messages], # type: ignore
-            stream=True,
-            **(kwargs | self.extra_kwargs),
-        ): # type: ignore
-            content = chunk.choices[0].delta.content
+        with span("llm.chat", model=self.model, messages=len(messages)) as s:
+            with span("llm.serialize"):
+                payload = [message.dump() for message in messages]
 
-            if content is None:
-                continue
+            if self.cassette is None:
+                events = self._chat_events(payload, kwargs)
+            else:
+                events = self.cassette.stream(
+                    ("chat", self.model, payload, kwargs),
+                    lambda: self._chat_events(payload, kwargs),
+                )
 
-            if self.callback:
-                if inspect.iscoroutinefunction(self.callback):
-                    await self.callback(content)
-                else:
-                    self.callback(content)
-
-            result.append(content)
+            result = await self._stream(events, s)
 
         return Message.assistant("".join(result))
 
@@ -126,14 +267,23 @@ class LLM:
         """
         Invoke chat completion on the LLM and parse the response into a Pydantic model.
         """
-        response = await self.client.beta.chat.completions.parse(
-            model=self.model,
-            messages=[message.dump() for message in messages], # type: ignore
-            response_format=model,
-            **kwargs,
-        )
-
-        result = response.choices[0].message.parsed
+        with span(
+            "llm.create", model=self.model, messages=len(messages), response_format=model.__name__
+        ) as s:
+            with span("llm.serialize"):
+                payload = [message.dump() for message in messages]
+
+            if self.cassette is None:
+                result, usage = await self._parse(model, payload, kwargs)
+            else:
+                result, usage = await self.cassette.parse(
+                    ("create", self.model, payload, model.model_json_schema(), kwargs),
+                    model,
+                    lambda: self._parse(model, payload, kwargs),
+                )
+
+            if usage is not None:
+                self._record(usage, s)
 
         if self.verbose:
             rich.print(result)
@@ -143,6 +293,16 @@ class LLM:
 
         return result
 
+    async def embed(self, texts: list[str], **kwargs) -> list[list[float]]:
+        """Embeds a batch of texts, with the LLM's model as embeddings model."""
+        with span("llm.embed", model=self.model, texts=len(texts)) as s:
+            vectors, usage = await self.backend.embed(self.model, texts, kwargs | self.extra_kwargs)
+
+            if usage is not None:
+                self._record(usage, s)
+
+        return vectors
+
     def wrap(self, target):
         llm_param = None
         parameters = inspect.signature(target).parameters
@@ -0,0 +1,219 @@
+import hashlib
+import os
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+import numpy as np
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from .tools import Tool
+
+
+type Embedder = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+class Document(BaseModel):
+    text: str
+    metadata: dict[str, Any] = {}
+
+
+class VectorIndex:
+    """
+    A flat index of normalized vectors with exact top-k search by cosine similarity.
+
+    Vectors live in a single NumPy array, which grows by doubling,
+    so adding many vectors one at a time stays cheap.
+    Saved indices can be loaded memory-mapped, so large indices
+    are paged in by the OS instead of read into memory.
+    """
+
+    def __init__(self, dim: int | None = None):
+        self.dim = dim
+        self.documents: list[Document] = []
+        self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.documents)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: len(self.documents)]
+
+    def add(self, vectors, documents: list[Document]):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(documents), -1)
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._vectors = np.empty((0, self.dim), dtype=np.float32)
+
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}.")
+
+        size = len(self.documents)
+        needed = size + len(vectors)
+
+        # memory-mapped arrays are read-only, so they are copied on the first write
+        if needed > len(self._vectors) or not self._vectors.flags.writeable:
+            buffer = np.empty((max(needed, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+            buffer[:size] = self._vectors[:size]
+            self._vectors = buffer
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self._vectors[size:needed] = vectors / np.maximum(norms, 1e-12)
+        self.documents.extend(documents)
+
+    def search(self, vector, k: int = 5) -> list[tuple[float, Document]]:
+        """
+        Returns the `k` most similar documents with their scores, best first.
+        """
+        if not self.documents:
+            return []
+
+        vector = np.asarray(vector, dtype=np.float32)
+        scores = self.vectors @ (vector / max(float(np.linalg.norm(vector)), 1e-12))
+        k = min(k, len(scores))
+
+        # partial sort: only the top k are ordered
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [(float(scores[i]), self.documents[i]) for i in top]
+
+    def save(self, path):
+        """
+        Saves the index as `<path>.npy` (vectors) and `<path>.jsonl` (documents).
+        """
+        np.save(f"{path}.npy", self.vectors)
+
+        with open(f"{path}.jsonl", "w") as fp:
+            for document in self.documents:
+                fp.write(document.model_dump_json() + "\n")
+
+    @classmethod
+    def load(cls, path, mmap: bool = True) -> "VectorIndex":
+        vectors = np.load(f"{path}.npy", mmap_mode="r" if mmap else None)
+        index = cls(vectors.shape[1])
+        index._vectors = vectors
+
+        with open(f"{path}.jsonl") as fp:
+            index.documents = [Document.model_validate_json(line) for line in fp if line.strip()]
+
+        return index
+
+
+class Memory:
+    """
+    Semantic memory: stores documents by their embeddings and retrieves
+    the most relevant ones for a query.
+
+    `embed` is any async function that embeds a batch of texts,
+    e.g., the `embed` method of an `LLM` for an embeddings model.
+    If `path` is given and an index exists there, it is loaded (memory-mapped),
+    and `save()` writes it back.
+
+        memory = Memory(LLM("text-embedding-3-small").embed)
+        agent = ChatAgent(..., memory=memory)
+    """
+
+    def __init__(self, embed: Embedder, path=None, index: VectorIndex | None = None):
+        self.embed = embed
+        self.path = path
+
+        if index is None and path is not None and os.path.exists(f"{path}.npy"):
+            index = VectorIndex.load(path)
+
+        self.index = index or VectorIndex()
+
+    def __len__(self):
+        return len(self.index)
+
+    async def remember(self, *documents: str | Document):
+        """Embeds and stores documents."""
+        documents = tuple(Document(text=d) if isinstance(d, str) else d for d in documents)
+
+        if not documents:
+            return
+
+        vectors = await self.embed([d.text for d in documents])
+        self.index.add(vectors, list(documents))
+
+    async def recall(self, query: str, k: int = 5) -> list[Document]:
+        """Returns the `k` documents most relevant to the query."""
+        if not self.index:
+            return []
+
+        [vector] = await self.embed([query])
+        return [document for _, document in self.index.search(vector, k)]
+
+    def save(self):
+        if self.path is None:
+            raise ValueError("This memory has no path to save to.")
+
+        self.index.save(self.path)
+
+
+class ToolIndex:
+    """
+    Preselects the tools most relevant to a request by embedding similarity,
+    so `Context.equip` only shows the LLM a few candidates
+    no matter how many tools the agent has.
+
+    Tool descriptions are embedded once, in a single batch the first time
+    they are seen, and cached by content in `path` (if given),
+    so restarts don't embed the catalog again.
+
+        agent = ChatAgent(..., tool_index=ToolIndex(embeddings.embed, path="tools", k=8))
+    """
+
+    def __init__(self, embed: Embedder, path=None, k: int = 8):
+        self.embed = embed
+        self.path = path
+        self.k = k
+        self.index = VectorIndex()
+        self.rows: dict[str, int] = {}
+
+        if path is not None and os.path.exists(f"{path}.npy"):
+            self.index = VectorIndex.load(path, mmap=False)
+            self.rows = {d.metadata["key"]: i for i, d in enumerate(self.index.documents)}
+
+    @staticmethod
+    def _describe(tool: "Tool") -> str:
+        return f"{tool.name}: {tool.description}"
+
+    @classmethod
+    def _key(cls, tool: "Tool") -> str:
+        return hashlib.sha256(cls._describe(tool).encode()).hexdigest()
+
+    async def _ensure(self, tools: list["Tool"]) -> list[int]:
+        keys = [self._key(tool) for tool in tools]
+        missing = {key: tool for key, tool in zip(keys, tools) if key not in self.rows}
+
+        if missing:
+            texts = [self._describe(tool) for tool in missing.values()]
+            vectors = await self.embed(texts)
+            start = len(self.index)
+            self.index.add(
+                vectors,
+                [Document(text=text, metadata=dict(key=key)) for key, text in zip(missing, texts)],
+            )
+            self.rows.update({key: start + i for i, key in enumerate(missing)})
+
+            if self.path is not None:
+                self.index.save(self.path)
+
+        return [self.rows[key] for key in keys]
+
+    async def select(self, tools: list["Tool"], query: str, k: int | None = None) -> list["Tool"]:
+        """Returns the `k` tools most similar to the query, best first."""
+        k = k or self.k
+
+        if len(tools) <= k:
+            return list(tools)
+
+        rows = await self._ensure(tools)
+        [vector] = await self.embed([query])
+        vector = np.asarray(vector, dtype=np.float32)
+        scores = self.index.vectors[rows] @ (vector / max(float(np.linalg.norm(vector)), 1e-12))
+        top = np.argpartition(-scores, k - 1)[:k]
+
+        return [tools[i] for i in top[np.argsort(-scores[top])]]
@@ -50,6 +50,41 @@ Reply with a JSON object in the following format:
 """
 
 
+DIRECT_CHOOSE_PROMPT = """
+Given the previous messages, you have
+to select one and only one of the following items
+to reply:
+
+{options}
+
+Reply only with a JSON object in the following format:
+
+{format}
+"""
+
+
+DIRECT_DECIDE_PROMPT = """
+Given the previous messages, you have
+to reply only with True or False.
+
+Reply only with a JSON object in the following format:
+
+{format}
+"""
+
+
+DIRECT_EQUIP_PROMPT = """
+Given the previous messages, you have to pick
+one of the following tools to invoke.
+
+{tools}
+
+Reply only with a JSON object in the following format:
+
+{format}
+"""
+
+
 DEFAULT_INVOKE_PROMPT = """
 Given the previous messages, your task
 is to generate parameters to invoke the following tool.
@@ -91,6 +126,20 @@ Reply with a JSON object in the following format:
 """
 
 
+DIRECT_ENGAGE_PROMPT = """
+You have the following skills:
+
+{skills}
+
+Given the previous messages, select the best
+skill to respond to the user.
+
+Reply only with a JSON object in the following format:
+
+{format}
+"""
+
+
 DEFAULT_CREATE_PROMPT = """
 Your task is to create an object of type {type} defined as
 a Pydantic model with the following signature:
@@ -105,3 +154,34 @@ Reply only with a JSON object that represents a {type} in the following format:
 
 {format}
 """
+
+
+DEFAULT_RECALL_PROMPT = """
+The following information from your memory
+might be relevant to the conversation:
+
+{documents}
+"""
+
+
+DEFAULT_MAP_PROMPT = """
+The following is one part of a longer document.
+
+{instructions}
+
+Document part:
+
+{chunk}
+"""
+
+
+DEFAULT_REDUCE_PROMPT = """
+The following are partial results obtained
+from consecutive parts of a longer document.
+
+{instructions}
+
+Partial results:
+
+{partials}
+"""
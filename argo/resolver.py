@@ -1,47 +1,162 @@
+import contextlib
+import contextvars
 import functools
 import inspect
+from typing import Any, Callable, Literal
+
+
+type Scope = Literal["singleton", "factory", "session"]
+
+
+_MISSING = object()
+
+_session: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "resolver_session", default=None
+)
+
+
+class Provider:
+    """
+    Builds a dependency when it is first needed, and decides how long it lives:
+
+    - `singleton`: built once, and shared from then on.
+    - `factory`: built again on every resolution.
+    - `session`: built once per `Resolver.session()` scope.
+    """
+
+    def __init__(self, factory: Callable[[], Any], scope: Scope = "singleton"):
+        if scope not in ("singleton", "factory", "session"):
+            raise ValueError(f"Unknown scope: {scope}")
+
+        self.factory = factory
+        self.scope = scope
+        self._value = _MISSING
+
+    @classmethod
+    def instance(cls, item) -> "Provider":
+        provider = cls(lambda: item)
+        provider._value = item
+        return provider
+
+    def get(self):
+        if self.scope == "factory":
+            return self.factory()
+
+        if self.scope == "session":
+            cache = _session.get()
+
+            if cache is None:
+                raise LookupError("Session dependencies can only be resolved inside a session.")
+
+            if self not in cache:
+                cache[self] = self.factory()
+
+            return cache[self]
+
+        if self._value is _MISSING:
+            self._value = self.factory()
+
+        return self._value
 
 
 class Resolver:
     """
     A simple dependency injection container.
+
+    Dependencies are registered as instances, or provided lazily by factories,
+    and resolved by type, including their base classes.
+    Resolutions are cached, so each type walks its MRO only once.
     """
     def __init__(self) -> None:
         self.items = {}
+        self.providers: dict[type, Provider] = {}
+        self._cache: dict[type, Provider] = {}
 
     def register(self, item):
         self.items[type(item)] = item
+        self._add(type(item), Provider.instance(item))
+
+    def provide[T](self, t: type[T], factory: Callable[[], T] | None = None, scope: Scope = "singleton"):
+        """
+        Registers a factory (by default, the type itself) to build
+        instances of `t` when they are first resolved.
+        """
+        self._add(t, Provider(factory or t, scope))
+
+    def _add(self, t: type, provider: Provider):
+        self.providers[t] = provider
+        # a new registration can shadow cached resolutions of subclasses
+        self._cache.clear()
+
+    def _provider(self, t: type) -> Provider | None:
+        provider = self._cache.get(t)
+
+        if provider is None:
+            for tt in t.mro():
+                if tt in self.providers:
+                    provider = self._cache[t] = self.providers[tt]
+                    break
+
+        return provider
 
     def resolve[T](self, t: type[T]) -> T:
-        for tt in t.mro():
-            if tt in self.items:
-                return self.items[tt]
+        provider = self._provider(t)
+
+        if provider is None:
+            raise ValueError(f"Could not resolve {t}")
+
+        return provider.get()
 
-        raise ValueError(f"Could not resolve {t}")
+    @contextlib.contextmanager
+    def session(self):
+        """
+        Scopes `session` dependencies: they are built once inside the block
+        (including tasks started from it), and dropped when it ends.
+        """
+        token = _session.set({})
+
+        try:
+            yield
+        finally:
+            _session.reset(token)
 
     def wrap(self, target):
         """
-        Decorator to wraps a function to automatically inject a resolver.
-        Returns a new function without the Resolver parameter.
+        Decorator to wraps a function to automatically inject a resolver,
+        and any dependency registered by the time it is applied.
+        Returns a new function without the injected parameters.
+
+        Which parameters to inject, and their providers, are found once here,
+        so calling the wrapped function does no lookups.
         """
-        resolver_param = None
-        parameters = inspect.signature(target).parameters
+        plan: list[tuple[str, Callable[[], Any]]] = []
+
+        for name, param in inspect.signature(target).parameters.items():
+            if not inspect.isclass(param.annotation) or param.annotation is inspect.Parameter.empty:
+                continue
 
-        for name, param in parameters.items():
             if issubclass(param.annotation, Resolver):
-                resolver_param = name
-                break
+                plan.append((name, lambda: self))
+            elif (provider := self._provider(param.annotation)) is not None:
+                plan.append((name, provider.get))
 
-        if resolver_param is None:
-            raise TypeError("Resolver parameter not found.")
+        if not plan:
+            raise TypeError("No parameters to inject found.")
 
         @functools.wraps(target)
         async def wrapper(*args, **kwargs):
-            kwargs[resolver_param] = self
+            for name, get in plan:
+                if name not in kwargs:
+                    kwargs[name] = get()
+
             return await target(*args, **kwargs)
 
-        # Remove the LLM param from wrapper so future
-        # introspection doesn't see this parameter
-        wrapper.__annotations__.pop(resolver_param)
+        # Remove the injected params from wrapper so future
+        # introspection doesn't see them (the annotations are
+        # copied, so the target keeps its own)
+        injected = {name for name, _ in plan}
+        wrapper.__annotations__ = {
+            k: v for k, v in target.__annotations__.items() if k not in injected
+        }
 
         return wrapper
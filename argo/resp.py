@@ -0,0 +1,239 @@
+import asyncio
+from typing import Any
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode(*args) -> bytes:
+    """Encodes a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        else:
+            data = str(arg).encode()
+
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+
+    return b"".join(parts)
+
+
+async def decode(reader: asyncio.StreamReader) -> Any:
+    """Reads a single RESP value from the stream."""
+    line = await reader.readline()
+
+    if not line:
+        raise ConnectionError("Connection closed by server.")
+
+    kind, payload = line[:1], line[1:-2]
+
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RedisError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        size = int(payload)
+
+        if size < 0:
+            return None
+
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(payload)
+
+        if size < 0:
+            return None
+
+        return [await decode(reader) for _ in range(size)]
+
+    raise RedisError(f"Invalid RESP reply: {line!r}")
+
+
+class RedisClient:
+    """
+    A minimal asyncio client for the Redis protocol (RESP2).
+
+    It only implements what argo needs to share state between processes,
+    and works against Redis or any server speaking the same protocol.
+    Commands are sent one at a time over a single lazily-opened connection.
+    Use `connection()` to get a dedicated connection for blocking commands.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+
+    async def _open(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        if self.db:
+            self._writer.write(encode("SELECT", self.db))
+            await self._writer.drain()
+            await decode(self._reader)
+
+    async def execute(self, *args) -> Any:
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._open()
+
+                self._writer.write(encode(*args))  # type: ignore
+                await self._writer.drain()  # type: ignore
+                return await decode(self._reader)  # type: ignore
+            except RedisError:
+                # the whole reply was read, so the connection is still in sync
+                raise
+            except BaseException:
+                # e.g., cancelled while waiting: the reply may still arrive,
+                # and the next command would read it, so the connection is dropped
+                self._discard()
+                raise
+
+    def _discard(self):
+        if self._writer is not None:
+            self._writer.close()
+
+        self._reader = self._writer = None
+
+    def connection(self) -> "RedisClient":
+        """Returns a new client with its own connection to the same server."""
+        return RedisClient(self.host, self.port, self.db)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._reader = self._writer = None
+
+
+class RedisStandIn:
+    """
+    A tiny in-memory server speaking the Redis protocol.
+
+    It implements only the handful of commands used by argo
+    (strings, lists and blocking pops), and is meant for
+    local development, tests and benchmarks, not production.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379):
+        self.host = host
+        self.port = port
+        self.data: dict[bytes, Any] = {}
+        self._changed = asyncio.Condition()
+        self._server: asyncio.Server | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # allow port=0 to pick a free port
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+
+            for writer in list(self._writers):
+                writer.close()
+
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+
+        try:
+            while True:
+                command = await decode(reader)
+                name, args = command[0].upper(), command[1:]
+
+                try:
+                    reply = await self._dispatch(name.decode(), args)
+                except RedisError as e:
+                    writer.write(b"-ERR %s\r\n" % str(e).encode())
+                else:
+                    writer.write(_reply(reply))
+
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, name: str, args: list[bytes]) -> Any:
+        if name in ("PING", "SELECT"):
+            return "PONG" if name == "PING" else "OK"
+        if name == "GET":
+            return self.data.get(args[0])
+        if name == "SET":
+            self.data[args[0]] = args[1]
+            return "OK"
+        if name == "DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == "LLEN":
+            return len(self.data.get(args[0], []))
+        if name == "LRANGE":
+            items = self.data.get(args[0], [])
+            start, stop = int(args[1]), int(args[2])
+            return items[start : (None if stop == -1 else stop + 1)]
+        if name in ("RPUSH", "LPUSH"):
+            items = self.data.setdefault(args[0], [])
+
+            for value in args[1:]:
+                if name == "RPUSH":
+                    items.append(value)
+                else:
+                    items.insert(0, value)
+
+            async with self._changed:
+                self._changed.notify_all()
+
+            return len(items)
+        if name == "LPOP":
+            items = self.data.get(args[0])
+            return items.pop(0) if items else None
+        if name == "BLPOP":
+            keys, timeout = args[:-1], float(args[-1])
+
+            async def ready():
+                async with self._changed:
+                    await self._changed.wait_for(
+                        lambda: any(self.data.get(key) for key in keys)
+                    )
+
+            try:
+                await asyncio.wait_for(ready(), timeout or None)
+            except TimeoutError:
+                return None
+
+            for key in keys:
+                if self.data.get(key):
+                    return [key, self.data[key].pop(0)]
+
+            return None
+
+        raise RedisError(f"unknown command '{name}'")
+
+
+def _reply(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_reply(v) for v in value)
+
+    raise TypeError(f"Cannot encode {value!r}")
@@ -0,0 +1,295 @@
+import asyncio
+import collections
+import copy
+import statistics
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from pydantic import BaseModel
+
+from .llm import LLM, Usage
+from .tracing import span
+
+
+_EMPTY = object()
+
+
+class Backend:
+    """
+    Latency and load statistics of one of the LLMs behind a router.
+    """
+
+    def __init__(self, llm: LLM, window: int = 100):
+        self.llm = llm
+        self.in_flight = 0
+        self.latency: float | None = None
+        self.observed_at = 0.0
+        self.samples: dict[str, collections.deque[float]] = collections.defaultdict(
+            lambda: collections.deque(maxlen=window)
+        )
+        self.failures = 0
+        self.failed_at: float | None = None
+
+    def observe(self, kind: str, latency: float):
+        # exponentially weighted, so the score follows changes in load
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.observed_at = time.monotonic()
+        self.samples[kind].append(latency)
+
+    def fail(self):
+        self.failures += 1
+        self.failed_at = time.monotonic()
+
+    def threshold(self, kind: str, quantile: float, min_samples: int) -> float | None:
+        """The latency quantile of this backend, once there are enough samples."""
+        samples = self.samples[kind]
+
+        if len(samples) < min_samples:
+            return None
+
+        # 99 cut points, for the 1st to the 99th percentile
+        percentile = min(max(int(quantile * 100), 1), 99)
+        return statistics.quantiles(samples, n=100, method="inclusive")[percentile - 1]
+
+    def score(self, cooldown: float, half_life: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        failed = self.failed_at is not None and now - self.failed_at < cooldown
+
+        # backends without measurements go first, so all of them get measured,
+        # and old measurements fade, so slow backends are eventually retried
+        latency = (self.latency or 0.0) * 0.5 ** ((now - self.observed_at) / half_life)
+        return failed, latency * (1 + self.in_flight)
+
+
+class RouterLLM(LLM):
+    """
+    A drop-in replacement for `LLM` that distributes calls among several backends.
+
+    Each call goes to the backend with the lowest expected latency
+    (its recent latency, scaled by the requests it has in flight).
+    Latencies fade with a `half_life` (in seconds) since they were measured,
+    so backends that were slow get tried again after a while.
+    If a call fails, it is retried on the next best backend, and a failing
+    backend is ranked last for `cooldown` seconds.
+
+    With `hedge=True`, once a backend has enough measurements, a call
+    that takes longer than its `quantile` latency (time to the first chunk,
+    for streamed calls) is also sent to the next best backend,
+    and the first one to respond wins.
+
+        llm = RouterLLM([
+            LLM("llama3", base_url="http://gpu-1:8000/v1"),
+            LLM("llama3", base_url="http://gpu-2:8000/v1"),
+        ])
+    """
+
+    def __init__(
+        self,
+        backends: list[LLM],
+        *,
+        hedge: bool = True,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        cooldown: float = 30.0,
+        half_life: float = 10.0,
+        callback: Callable[[str], None] | None = None,
+        verbose: bool = False,
+        stream_usage: bool = True,
+        cassette=None,
+        **extra_kwargs,
+    ):
+        if not backends:
+            raise ValueError("At least one backend is required.")
+
+        if not 0 < quantile < 1:
+            raise ValueError("The hedging quantile must be between 0 and 1.")
+
+        # each backend has its own engine, so the base initialization is skipped
+        self.model = "|".join(dict.fromkeys(llm.model for llm in backends))
+        self.verbose = verbose
+        self.backend = None  # type: ignore
+        self.callback = callback
+        self.stream_usage = stream_usage
+        self.cassette = cassette
+        self.extra_kwargs = extra_kwargs
+        self.usage = Usage()
+
+        self.backends = [Backend(llm) for llm in backends]
+        self.hedge = hedge
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.half_life = half_life
+
+    def with_model(self, model: str) -> "RouterLLM":
+        """
+        Returns a router over the same endpoints with another model,
+        with fresh latency statistics and usage totals.
+        """
+        router = copy.copy(self)
+        router.model = model
+        router.usage = Usage()
+        router.backends = [Backend(b.llm.with_model(model)) for b in self.backends]
+        return router
+
+    def _ranked(self) -> list[Backend]:
+        return sorted(self.backends, key=lambda b: b.score(self.cooldown, self.half_life))
+
+    async def _race(
+        self,
+        kind: str,
+        call: Callable[[Backend], Awaitable],
+        release: Callable[[Backend, Any], Awaitable] | None = None,
+    ) -> tuple[Any, Backend]:
+        """
+        Runs `call` on the best backend, hedging and failing over as configured.
+        Results of losing backends are passed to `release`.
+        """
+        ranked = self._ranked()
+        pending: dict[asyncio.Task, Backend] = {}
+        errors: list[BaseException] = []
+        hedged = not self.hedge
+
+        async def timed(backend: Backend):
+            start = time.monotonic()
+
+            try:
+                result = await call(backend)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                backend.fail()
+                raise
+
+            backend.observe(kind, time.monotonic() - start)
+            return result
+
+        def launch():
+            backend = ranked.pop(0)
+            pending[asyncio.create_task(timed(backend))] = backend
+            return backend
+
+        primary = launch()
+        winner = None
+
+        try:
+            while pending:
+                timeout = None
+
+                if not hedged and ranked:
+                    timeout = primary.threshold(kind, self.quantile, self.min_samples)
+
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+
+                    if task.exception() is not None:
+                        errors.append(task.exception())  # type: ignore
+                    elif winner is None:
+                        winner = task.result(), backend
+                    elif release is not None:
+                        await release(backend, task.result())
+
+                if winner is not None:
+                    return winner
+
+                # fail over to the next best backend
+                if not pending and ranked:
+                    primary = launch()
+
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
+
+            if pending:
+                results = await asyncio.gather(*pending, return_exceptions=True)
+
+                for (task, backend), result in zip(pending.items(), results):
+                    if release is not None and not isinstance(result, BaseException):
+                        await release(backend, result)
+
+    async def _events(
+        self, kind: str, source: Callable[[LLM], AsyncIterator[str | Usage]]
+    ) -> AsyncIterator[str | Usage]:
+        async def start(backend: Backend):
+            # a stream counts as responded when its first event arrives
+            backend.in_flight += 1
+            events = source(backend.llm)
+
+            try:
+                return events, await anext(events, _EMPTY)
+            except BaseException:
+                backend.in_flight -= 1
+                await events.aclose()
+                raise
+
+        async def release(backend: Backend, opened):
+            backend.in_flight -= 1
+            await opened[0].aclose()
+
+        (events, first), backend = await self._race(kind, start, release)
+
+        try:
+            if first is _EMPTY:
+                return
+
+            yield first
+
+            async for event in events:
+                yield event
+        finally:
+            backend.in_flight -= 1
+            await events.aclose()
+
+    def _complete_events(self, prompt: str, kwargs: dict) -> AsyncIterator[str | Usage]:
+        return self._events(
+            "complete", lambda llm: llm._complete_events(prompt, kwargs | llm.extra_kwargs)
+        )
+
+    def _chat_events(self, payload: list[dict], kwargs: dict) -> AsyncIterator[str | Usage]:
+        return self._events(
+            "chat", lambda llm: llm._chat_events(payload, kwargs | llm.extra_kwargs)
+        )
+
+    async def _parse[T: BaseModel](
+        self, model: type[T], payload: list[dict], kwargs: dict
+    ) -> tuple[T | None, Usage | None]:
+        async def call(backend: Backend):
+            backend.in_flight += 1
+
+            try:
+                return await backend.llm._parse(model, payload, kwargs | backend.llm.extra_kwargs)
+            finally:
+                backend.in_flight -= 1
+
+        result, _ = await self._race("create", call)
+        return result
+
+    async def embed(self, texts: list[str], **kwargs) -> list[list[float]]:
+        async def call(backend: Backend):
+            backend.in_flight += 1
+
+            try:
+                # each backend records the usage on its own LLM, so it's recorded here instead
+                return await backend.llm.backend.embed(
+                    backend.llm.model, texts, kwargs | self.extra_kwargs | backend.llm.extra_kwargs
+                )
+            finally:
+                backend.in_flight -= 1
+
+        with span("llm.embed", model=self.model, texts=len(texts)) as s:
+            (vectors, usage), _ = await self._race("embed", call)
+
+            if usage is not None:
+                self._record(usage, s)
+
+        return vectors
@@ -1,11 +1,24 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
+import json
+import os
+import time
+import uuid
+import weakref
+from urllib.parse import urlparse
+from typing import Any, Literal, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, create_model
+from pydantic import BaseModel, ValidationError, create_model
 
 from argo.tools import Tool
 
-from .agent import ChatAgent
-from .llm import Message
+from .agent import ChatAgent, UsageMetrics
+from .context import ToolResult
+from .llm import LLM, Message, Usage, recording, streaming
+from .sessions import SessionStore, MemoryStore, open_store
+from .tracing import configure_from_env, span
 
 
 class SkillDescription(BaseModel):
@@ -26,20 +39,144 @@ class AgentDescription(BaseModel):
     tools: list[ToolDescription]
 
 
-def build(agent: ChatAgent) -> FastAPI:
+class ToolCall(BaseModel):
+    tool: str
+    parameters: dict[str, Any] = {}
+
+
+class CompletionMessage(BaseModel):
+    role: str
+    content: str | list[dict[str, Any]] | None = None
+
+    def to_message(self) -> Message:
+        content = self.content or ""
+
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content)
+
+        role = {"developer": "system"}.get(self.role, self.role)
+        return Message(role=role, content=content)  # type: ignore
+
+
+class StreamOptions(BaseModel):
+    include_usage: bool = False
+
+
+class CompletionRequest(BaseModel):
+    model: str | None = None
+    messages: list[CompletionMessage]
+    stream: bool = False
+    stream_options: StreamOptions | None = None
+
+
+class CompletionUsage(BaseModel):
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+    @classmethod
+    def from_usage(cls, usage: Usage) -> "CompletionUsage":
+        return cls(
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            total_tokens=usage.total_tokens,
+        )
+
+
+class CompletionChoice(BaseModel):
+    index: int = 0
+    message: CompletionMessage
+    finish_reason: Literal["stop"] = "stop"
+
+
+class CompletionResponse(BaseModel):
+    id: str
+    object: Literal["chat.completion"] = "chat.completion"
+    created: int
+    model: str
+    choices: list[CompletionChoice]
+    usage: CompletionUsage | None = None
+
+
+class ModelDescription(BaseModel):
+    id: str
+    object: Literal["model"] = "model"
+    created: int = 0
+    owned_by: str = "argo"
+
+
+class ModelList(BaseModel):
+    object: Literal["list"] = "list"
+    data: list[ModelDescription]
+
+
+class ToolSchema:
+    """
+    The request and response models of a tool, built once when the app is created.
+    """
+
+    def __init__(self, tool: Tool):
+        self.tool = tool
+        self.parameters = build_model(tool)
+        self.result = build_result_model(tool)
+
+    async def run(self, params: BaseModel) -> ToolResult:
+        try:
+            # keep nested models as objects, as the tool declares them
+            with span("tool.run", tool=self.tool.name):
+                result = await self.tool.run(**dict(params))
+
+            # a result that doesn't match the annotation is this call's error
+            return self.result(tool=self.tool.name, result=result)
+        except Exception as e:
+            return self.result(tool=self.tool.name, error=str(e))
+
+
+def build(
+    agent: ChatAgent,
+    store: SessionStore | None = None,
+    window: int | None = None,
+    watch: str | None = None,
+) -> FastAPI:
     """
     Builds a FastAPI app from an agent.
 
     This method sets up the following default routes:
      - `/` to return the agent's description.
      - `/chat` to perform the chat with the agent.
+     - `/metrics` to return the agent's token usage.
 
     It also sets up endpoints for each tool.
 
-    The agent is stored in the app's state, so it can be accessed from the routes.
+    Conversations are keyed by the `X-Session-Id` header and kept in `store`,
+    so the agent itself is stateless and any worker can serve any session.
+    If the header is missing, a new session is created and its id returned
+    in the response headers (which also allows sticky routing at the load balancer).
+    If `window` is given, only the last `window` messages of a session are loaded for each turn.
+    If `watch` is the YAML file the agent was compiled from, the agent is updated when it changes,
+    including its tool routes.
+
+    The agent and store are stored in the app's state, so they can be accessed from the routes.
     """
-    app = FastAPI()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI):
+        from .declarative import watch as watch_config
+
+        task = asyncio.create_task(watch_config(watch, agent, on_reload=sync_tools)) if watch else None
+
+        try:
+            yield
+        finally:
+            if task is not None:
+                task.cancel()
+
+    app = FastAPI(lifespan=lifespan)
     app.state.agent = agent
+    app.state.store = store = store or MemoryStore()
+
+    # serializes turns of the same session within this process
+    locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
 
     @app.get("/")
     def info() -> AgentDescription:
@@ -56,35 +193,294 @@ def build(agent: ChatAgent) -> FastAPI:
             tools=[ToolDescription(
                 name=tool.name,
                 description=tool.description,
-                parameters={ k:str(v) for k,v in tool.parameters() },
+                parameters={ k:str(v) for k,v in tool.parameters().items() },
             ) for tool in agent.tools],
         )
 
     @app.post("/chat")
-    async def chat(message: Message) -> Message:
-        return await agent.perform(message)
+    async def chat(
+        message: Message,
+        response: Response,
+        session: str | None = Header(None, alias="X-Session-Id"),
+    ) -> Message:
+        session = session or uuid.uuid4().hex
+        response.headers["X-Session-Id"] = session
+
+        lock = locks.get(session)
+
+        if lock is None:
+            lock = locks[session] = asyncio.Lock()
+
+        async with lock:
+            history = [Message.system(agent.system_prompt)] + await store.load(session, limit=window)
+            conversation = await agent.respond(history, message)
+            await store.append(session, conversation[len(history):])
+
+        return conversation[-1]
+
+    @app.get("/metrics")
+    async def metrics() -> UsageMetrics:
+        """
+        Token usage of the agent since the server started, by skill and primitive.
+        """
+        return agent.metrics()
+
+    @app.get("/v1/models")
+    async def models() -> ModelList:
+        return ModelList(data=[ModelDescription(id=agent.name)])
+
+    @app.post("/v1/chat/completions", response_model=None)
+    async def completions(request: CompletionRequest) -> CompletionResponse | StreamingResponse:
+        """
+        OpenAI-compatible chat completions.
+
+        The request carries the whole conversation, as in the OpenAI API,
+        and the agent replies to the last message with its own skills.
+        """
+        if not request.messages:
+            raise HTTPException(status_code=400, detail="At least one message is required.")
+
+        messages = [m.to_message() for m in request.messages]
+        history = [Message.system(agent.system_prompt)] + messages[:-1]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if not request.stream:
+            usage = Usage()
+
+            with recording(usage.add):
+                conversation = await agent.respond(history, messages[-1])
+
+            return CompletionResponse(
+                id=completion_id,
+                created=created,
+                model=agent.name,
+                choices=[
+                    CompletionChoice(
+                        message=CompletionMessage(
+                            role="assistant", content=conversation[-1].dump()["content"]
+                        )
+                    )
+                ],
+                usage=CompletionUsage.from_usage(usage),
+            )
+
+        include_usage = request.stream_options is not None and request.stream_options.include_usage
+
+        return StreamingResponse(
+            _stream_completion(agent, history, messages[-1], completion_id, created, include_usage),
+            media_type="text/event-stream",
+        )
+
+    registry: dict[str, ToolSchema] = {}
+    routes: dict[str, Any] = {}
+    app.state.tools = registry
+
+    def sync_tools():
+        """Matches the tool routes with the agent's current tools."""
+        current = {tool.name: tool for tool in agent.tools}
+
+        for name in list(registry):
+            if current.get(name) is not registry[name].tool:
+                del registry[name]
+                app.router.routes.remove(routes.pop(name))
+
+        for name, tool in current.items():
+            if name not in registry:
+                registry[name] = ToolSchema(tool)
+                routes[name] = _add_tool_route(app, registry, registry[name])
+
+        # the docs are generated again with the new routes
+        app.openapi_schema = None
+
+    sync_tools()
+
+    @app.post("/tools/batch")
+    async def invoke_batch(calls: list[ToolCall]) -> list[ToolResult]:
+        """
+        Invoke many tools concurrently in a single request.
+
+        Results are returned in the same order as the calls,
+        and a failing call doesn't affect the others.
+        """
+
+        async def run(call: ToolCall) -> ToolResult:
+            schema = registry.get(call.tool)
+
+            if schema is None:
+                return ToolResult(tool=call.tool, error=f"Unknown tool: {call.tool}")
+
+            try:
+                params = schema.parameters.model_validate(call.parameters)
+            except ValidationError as e:
+                return ToolResult(tool=call.tool, error=str(e))
 
-    for tool in agent.tools:
-        model_cls = build_model(tool)
+            return await schema.run(params)
 
-        @app.post(f"/{tool.name}", response_model=model_cls)
-        async def invoke_tool(params: model_cls) -> dict:
-            return await tool.run(**params.dict())
+        return await asyncio.gather(*[run(call) for call in calls])
 
     return app
 
 
+async def _stream_completion(
+    agent: ChatAgent,
+    history: list[Message],
+    input: Message,
+    completion_id: str,
+    created: int,
+    include_usage: bool = False,
+):
+    queue: asyncio.Queue[str | None] = asyncio.Queue()
+    usage = Usage()
+
+    async def produce():
+        try:
+            # these scopes only cover this task, so concurrent requests don't mix
+            with streaming(queue.put_nowait), recording(usage.add):
+                return await agent.respond(history, input)
+        finally:
+            queue.put_nowait(None)
+
+    def chunk(delta: dict | None, finish_reason: str | None = None, **extra) -> str:
+        data = dict(
+            id=completion_id,
+            object="chat.completion.chunk",
+            created=created,
+            model=agent.name,
+            choices=[] if delta is None else [dict(index=0, delta=delta, finish_reason=finish_reason)],
+            **extra,
+        )
+        return f"data: {json.dumps(data)}\n\n"
+
+    task = asyncio.create_task(produce())
+    streamed = False
+
+    try:
+        yield chunk(dict(role="assistant", content=""))
+
+        while (content := await queue.get()) is not None:
+            streamed = True
+            yield chunk(dict(content=content))
+
+        conversation = await task
+
+        # skills that don't stream (e.g., only structured calls) still produce a reply
+        if not streamed:
+            yield chunk(dict(content=conversation[-1].dump()["content"]))
+
+        yield chunk({}, finish_reason="stop")
+
+        if include_usage:
+            yield chunk(None, usage=CompletionUsage.from_usage(usage).model_dump())
+
+        yield "data: [DONE]\n\n"
+    finally:
+        task.cancel()
+
+
+def _add_tool_route(app: FastAPI, registry: dict[str, ToolSchema], schema: ToolSchema):
+    # a separate scope per tool, so each route runs its own tool
+    async def invoke_tool(params: schema.parameters):  # type: ignore
+        # a reload may have removed the tool while the request was routed
+        if registry.get(schema.tool.name) is not schema:
+            raise HTTPException(status_code=404, detail=f"Unknown tool: {schema.tool.name}")
+
+        return await schema.run(params)
+
+    app.post(
+        f"/{schema.tool.name}",
+        response_model=schema.result,
+        description=schema.tool.description,
+    )(invoke_tool)
+
+    return app.router.routes[-1]
+
+
 def build_model(tool: Tool) -> type[BaseModel]:
     """
     Builds a Pydantic model from a tool.
     """
     return create_model(
-        tool.name,
-        **{k: v for k, v in tool.parameters()},
+        tool.name.title().replace("_", ""),
+        **{k: (v, ...) for k, v in tool.parameters().items()},
+    )
+
+
+def build_result_model(tool: Tool) -> type[ToolResult]:
+    """
+    Builds a `ToolResult` model whose result is typed by the tool's return annotation.
+    """
+    return create_model(
+        tool.name.title().replace("_", "") + "Result",
+        __base__=ToolResult,
+        # `Optional` also accepts `None` and typing forms that don't support `|`
+        result=(Optional[tool.returns()], None),
     )
 
 
-def serve(agent: ChatAgent, host:str="127.0.0.1", port:int=8000):
-    app = build(agent)
+def serve(
+    agent: ChatAgent,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    store: SessionStore | None = None,
+    window: int | None = None,
+    watch: str | None = None,
+):
+    app = build(agent, store, window, watch)
     import uvicorn
     uvicorn.run(app, host=host, port=port)
+
+
+def create_app() -> FastAPI:
+    """
+    Application factory used when serving with several worker processes.
+
+    Each worker builds its own agent from the configuration passed
+    through the environment by `serve_workers`.
+    """
+    from .declarative import parse
+
+    configure_from_env()
+    llm = LLM(model=os.environ["MODEL"], verbose=os.getenv("ARGO_VERBOSE") == "1")
+    agent = parse(os.environ["ARGO_CONFIG"]).compile(llm)
+    window = os.getenv("ARGO_WINDOW")
+    watch = os.environ["ARGO_CONFIG"] if os.getenv("ARGO_WATCH") == "1" else None
+    return build(agent, open_store(os.getenv("ARGO_STORE")), int(window) if window else None, watch)
+
+
+def _memory_sqlite(store: str) -> bool:
+    parsed = urlparse(store)
+    return parsed.scheme == "sqlite" and parsed.path.removeprefix("/") in ("", ":memory:")
+
+
+def serve_workers(
+    path,
+    workers: int,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    store: str | None = None,
+    window: int | None = None,
+    watch: bool = False,
+):
+    """
+    Serves the agent defined in a YAML file with several worker processes.
+
+    Sessions must live in a store shared by all workers (e.g., `sqlite:///sessions.db`).
+    LLM settings are read by each worker from the `MODEL`, `BASE_URL`
+    and `API_KEY` environment variables.
+    """
+    # log stores and in-memory sqlite index sessions in the process, so they can't be shared either
+    if workers > 1 and (not store or store.startswith(("memory:", "log:")) or _memory_sqlite(store)):
+        raise ValueError("Serving with several workers requires a shared session store.")
+
+    os.environ["ARGO_CONFIG"] = os.path.abspath(path)
+
+    if store:
+        os.environ["ARGO_STORE"] = store
+    if window:
+        os.environ["ARGO_WINDOW"] = str(window)
+    if watch:
+        os.environ["ARGO_WATCH"] = "1"
+
+    import uvicorn
+    uvicorn.run("argo.server:create_app", factory=True, host=host, port=port, workers=workers)
@@ -0,0 +1,399 @@
+import abc
+import asyncio
+import contextlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from urllib.parse import urlparse
+
+from .llm import Message
+
+
+class SessionStore(abc.ABC):
+    """
+    Represents a storage for conversation histories.
+
+    Sessions are identified by an opaque string id, and hold the list
+    of messages exchanged after the agent's system prompt.
+    Externalizing this state allows several processes (or hosts)
+    to serve the same sessions without sticky routing.
+    """
+
+    @abc.abstractmethod
+    async def load(self, session: str, limit: int | None = None) -> list[Message]:
+        """
+        Returns the messages in a session, or an empty list if it doesn't exist.
+        If `limit` is given, only the last `limit` messages are returned.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def append(self, session: str, messages: list[Message]):
+        """Appends new messages at the end of a session."""
+        pass
+
+    @abc.abstractmethod
+    async def delete(self, session: str):
+        """Removes a session completely."""
+        pass
+
+
+class MemoryStore(SessionStore):
+    """
+    A simple in-process store.
+
+    Only useful with a single worker, since sessions are not shared across processes.
+    """
+
+    def __init__(self):
+        self.sessions: dict[str, list[Message]] = {}
+
+    async def load(self, session: str, limit: int | None = None) -> list[Message]:
+        messages = self.sessions.get(session, [])
+        return list(messages[-limit:] if limit else messages)
+
+    async def append(self, session: str, messages: list[Message]):
+        self.sessions.setdefault(session, []).extend(messages)
+
+    async def delete(self, session: str):
+        self.sessions.pop(session, None)
+
+
+class SQLiteStore(SessionStore):
+    """
+    A store backed by a SQLite database.
+
+    The database runs in WAL mode, so several worker processes in the
+    same host can read and write sessions concurrently.
+
+    An in-memory database (`:memory:`) lives in a single connection,
+    so it is only visible to the process that created it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._shared: sqlite3.Connection | None = None
+        self._lock = contextlib.nullcontext()
+
+        if path == ":memory:":
+            # each connection would get its own empty database, so all threads share one
+            self._shared = sqlite3.connect(path, check_same_thread=False)
+            self._lock = threading.Lock()
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "session TEXT NOT NULL, "
+                "role TEXT NOT NULL, "
+                "content TEXT NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS messages_session ON messages (session, id)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._shared is not None:
+            return self._shared
+
+        # sqlite connections can't be shared across threads
+        db = getattr(self._local, "db", None)
+
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            self._local.db = db
+
+        return db
+
+    def _load(self, session: str, limit: int | None) -> list[Message]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT role, content FROM ("
+                "SELECT id, role, content FROM messages WHERE session = ? ORDER BY id DESC LIMIT ?"
+                ") ORDER BY id",
+                (session, limit or -1),
+            ).fetchall()
+
+        return [Message(role=role, content=content) for role, content in rows]
+
+    def _append(self, session: str, messages: list[Message]):
+        with self._lock, self._connect() as db:
+            db.executemany(
+                "INSERT INTO messages (session, role, content) VALUES (?, ?, ?)",
+                [(session, m.role, m.dump()["content"]) for m in messages],
+            )
+
+    def _delete(self, session: str):
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM messages WHERE session = ?", (session,))
+
+    async def load(self, session: str, limit: int | None = None) -> list[Message]:
+        return await asyncio.to_thread(self._load, session, limit)
+
+    async def append(self, session: str, messages: list[Message]):
+        await asyncio.to_thread(self._append, session, messages)
+
+    async def delete(self, session: str):
+        await asyncio.to_thread(self._delete, session)
+
+
+class RedisStore(SessionStore):
+    """
+    A store backed by a Redis (or Redis-compatible) server.
+
+    Each session is stored as a list of JSON-encoded messages,
+    so it can be shared by workers in different hosts.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, prefix: str = "argo:session:"):
+        from .resp import RedisClient
+
+        self.client = RedisClient(host, port, db)
+        self.prefix = prefix
+
+    async def load(self, session: str, limit: int | None = None) -> list[Message]:
+        items = await self.client.execute("LRANGE", self.prefix + session, -limit if limit else 0, -1)
+        return [Message.model_validate_json(item) for item in items]
+
+    async def append(self, session: str, messages: list[Message]):
+        if not messages:
+            return
+
+        await self.client.execute(
+            "RPUSH",
+            self.prefix + session,
+            *[json.dumps(m.dump()) for m in messages],
+        )
+
+    async def delete(self, session: str):
+        await self.client.execute("DEL", self.prefix + session)
+
+
+class LogStore(SessionStore):
+    """
+    A store backed by an append-only log file.
+
+    Each message is a length-prefixed record tagged with its session id,
+    so appending is a single write and the file never needs rewriting on the hot path.
+    An index of record offsets by session is built when the file is opened,
+    and records are read through a memory map, so loading a session
+    (or only its last messages) touches only that session's records.
+
+    Deleting a session appends a tombstone. Once dead records take up more than
+    `compact_ratio` of the file (and at least `compact_min` bytes), the log is
+    compacted by rewriting only the live records.
+
+    The index lives in the process, so a log must be served by a single process.
+    """
+
+    _HEADER = struct.Struct("<IH")
+    _MESSAGE = b"m"
+    _DELETE = b"d"
+
+    def __init__(
+        self,
+        path: str,
+        sync: bool = False,
+        compact_ratio: float = 0.5,
+        compact_min: int = 1 << 20,
+    ):
+        self.path = path
+        self.sync = sync
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self.index: dict[str, list[int]] = {}
+        self.dead = 0
+        self._lock = threading.Lock()
+        self._map: mmap.mmap | None = None
+        self._file = open(path, "a+b")
+        self._scan()
+
+    def _remap(self):
+        size = os.fstat(self._file.fileno()).st_size
+
+        if self._map is not None and len(self._map) == size:
+            return
+
+        if self._map is not None:
+            self._map.close()
+
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ) if size else None
+
+    def _records(self):
+        """Yields (offset, end, session, kind) for every complete record."""
+        self._remap()
+        data = self._map or b""
+        offset = 0
+
+        while offset + self._HEADER.size <= len(data):
+            length, session_length = self._HEADER.unpack_from(data, offset)
+            end = offset + 4 + length
+
+            if end > len(data):
+                break
+
+            start = offset + self._HEADER.size
+            session = bytes(data[start : start + session_length]).decode()
+            kind = bytes(data[start + session_length : start + session_length + 1])
+            yield offset, end, session, kind
+            offset = end
+
+    def _scan(self):
+        end = 0
+
+        for offset, end, session, kind in self._records():
+            if kind == self._DELETE:
+                self.dead += sum(self._size(o) for o in self.index.pop(session, [])) + end - offset
+            else:
+                self.index.setdefault(session, []).append(offset)
+
+        # drop a record left half-written by a crash
+        if end < os.fstat(self._file.fileno()).st_size:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+            self._file.truncate(end)
+            self._remap()
+
+    def _size(self, offset: int) -> int:
+        return 4 + self._HEADER.unpack_from(self._map, offset)[0]  # type: ignore
+
+    def _encode(self, session: str, kind: bytes, payload: bytes = b"") -> bytes:
+        key = session.encode()
+        body = struct.pack("<H", len(key)) + key + kind + payload
+        return struct.pack("<I", len(body)) + body
+
+    def _read(self, offset: int) -> Message:
+        length, session_length = self._HEADER.unpack_from(self._map, offset)  # type: ignore
+        start = offset + self._HEADER.size + session_length + 1
+        return Message.model_validate_json(self._map[start : offset + 4 + length])  # type: ignore
+
+    def _write(self, records: list[bytes]) -> int:
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(b"".join(records))
+        self._file.flush()
+
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+        return offset
+
+    def _load(self, session: str, limit: int | None) -> list[Message]:
+        with self._lock:
+            offsets = self.index.get(session, [])
+
+            if limit:
+                offsets = offsets[-limit:]
+
+            if not offsets:
+                return []
+
+            self._remap()
+            return [self._read(offset) for offset in offsets]
+
+    def _append(self, session: str, messages: list[Message]):
+        records = [
+            self._encode(session, self._MESSAGE, json.dumps(m.dump()).encode()) for m in messages
+        ]
+
+        with self._lock:
+            offset = self._write(records)
+            offsets = self.index.setdefault(session, [])
+
+            for record in records:
+                offsets.append(offset)
+                offset += len(record)
+
+    def _delete(self, session: str):
+        with self._lock:
+            offsets = self.index.pop(session, None)
+
+            if offsets is None:
+                return
+
+            self._remap()
+            tombstone = self._encode(session, self._DELETE)
+            self.dead += sum(self._size(o) for o in offsets) + len(tombstone)
+            self._write([tombstone])
+
+            size = os.fstat(self._file.fileno()).st_size
+
+            if self.dead >= self.compact_min and self.dead > self.compact_ratio * size:
+                self._compact()
+
+    def _compact(self):
+        self._remap()
+        tmp = self.path + ".compact"
+        index: dict[str, list[int]] = {}
+
+        with open(tmp, "wb") as fp:
+            for session, offsets in self.index.items():
+                for offset in offsets:
+                    index.setdefault(session, []).append(fp.tell())
+                    fp.write(self._map[offset : offset + self._size(offset)])  # type: ignore
+
+            fp.flush()
+            os.fsync(fp.fileno())
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a+b")
+        self.index = index
+        self.dead = 0
+
+    def compact(self):
+        """Rewrites the log with only the live records."""
+        with self._lock:
+            self._compact()
+
+    async def load(self, session: str, limit: int | None = None) -> list[Message]:
+        return await asyncio.to_thread(self._load, session, limit)
+
+    async def append(self, session: str, messages: list[Message]):
+        if messages:
+            await asyncio.to_thread(self._append, session, messages)
+
+    async def delete(self, session: str):
+        await asyncio.to_thread(self._delete, session)
+
+
+def open_store(url: str | None) -> SessionStore:
+    """
+    Creates a store from a URL.
+
+    Supported schemes are `memory://`, `sqlite:///path/to/file.db`,
+    `log:///path/to/file.log` and `redis://host:port/db`.
+    """
+    if not url:
+        return MemoryStore()
+
+    parsed = urlparse(url)
+
+    if parsed.scheme == "memory":
+        return MemoryStore()
+
+    if parsed.scheme == "sqlite":
+        return SQLiteStore(parsed.path.removeprefix("/") or ":memory:")
+
+    if parsed.scheme == "log":
+        return LogStore(parsed.path.removeprefix("/"))
+
+    if parsed.scheme == "redis":
+        return RedisStore(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.strip("/") or 0),
+        )
+
+    raise ValueError(f"Unsupported session store: {url}")
@@ -1,5 +1,6 @@
 import inspect
 import abc
+from typing import Any
 
 
 class Tool:
@@ -19,6 +20,9 @@ class Tool:
     def parameters(self) -> dict[str, type]:
         pass
 
+    def returns(self) -> type:
+        return Any  # type: ignore
+
     @abc.abstractmethod
     async def run(self, **kwargs):
         pass
@@ -33,5 +37,8 @@ class MethodTool(Tool):
         args = inspect.get_annotations(self._target)
         return {name: type for name, type in args.items() if name != "return"}
 
+    def returns(self):
+        return inspect.get_annotations(self._target).get("return", Any)
+
     async def run(self, **kwargs):
         return await self._target(**kwargs)
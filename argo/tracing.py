@@ -0,0 +1,228 @@
+import abc
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any
+
+
+class Span:
+    """
+    A timed operation with attributes, following the OpenTelemetry data model.
+    """
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_time = time.time_ns()
+        self.end_time: int | None = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def elapsed(self) -> float:
+        """Seconds since the span started."""
+        return (time.time_ns() - self.start_time) / 1e9
+
+    def to_dict(self) -> dict:
+        return dict(
+            name=self.name,
+            trace_id=self.trace_id,
+            span_id=self.span_id,
+            parent_id=self.parent_id,
+            start_time_unix_nano=self.start_time,
+            end_time_unix_nano=self.end_time,
+            attributes=self.attributes,
+        )
+
+
+class _NoopSpan(Span):
+    def __init__(self):
+        pass
+
+    def set(self, **attributes):
+        pass
+
+    def elapsed(self) -> float:
+        return 0.0
+
+
+class Tracer(abc.ABC):
+    """
+    Receives spans as they finish.
+    """
+
+    def start(self, span: Span):
+        """Called when a span starts, before any of its children."""
+        pass
+
+    @abc.abstractmethod
+    def export(self, span: Span):
+        pass
+
+
+class FileTracer(Tracer):
+    """
+    Appends finished spans to a JSONL file, for offline analysis.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fp = open(path, "a")
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str)
+
+        with self._lock:
+            self._fp.write(line + "\n")
+            self._fp.flush()
+
+
+class MemoryTracer(Tracer):
+    """
+    Keeps finished spans in a list, mostly useful in tests and notebooks.
+    """
+
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Forwards spans to OpenTelemetry, so they can be sent to any OTel exporter.
+    Requires the `opentelemetry-api` package.
+
+    OTel spans are started along with argo's and made current while they run,
+    so they keep the same hierarchy, nested under any active OTel span
+    (e.g., an instrumented request), and instrumented libraries nest under them.
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import context, trace
+
+        self.tracer = tracer or trace.get_tracer("argo")
+        self._context = context
+        self._trace = trace
+        self._live: dict[str, tuple[Any, object]] = {}
+
+    def start(self, span: Span):
+        otel_span = self.tracer.start_span(span.name, start_time=span.start_time)
+        token = self._context.attach(self._trace.set_span_in_context(otel_span))
+        self._live[span.span_id] = (otel_span, token)
+
+    def export(self, span: Span):
+        attributes = {
+            k: v if isinstance(v, (str, bool, int, float)) else str(v)
+            for k, v in span.attributes.items()
+        }
+        attributes["argo.trace_id"] = span.trace_id
+        attributes["argo.parent_id"] = span.parent_id or ""
+        live = self._live.pop(span.span_id, None)
+
+        if live is None:
+            # started before this tracer was installed
+            otel_span = self.tracer.start_span(span.name, start_time=span.start_time)
+        else:
+            otel_span, token = live
+            self._context.detach(token)
+
+        otel_span.set_attributes(attributes)
+        otel_span.end(end_time=span.end_time)
+
+
+_tracer: Tracer | None = None
+_NOOP = _NoopSpan()
+_current: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def set_tracer(tracer: Tracer | None):
+    """
+    Installs a global tracer. With no tracer (the default), tracing costs nothing.
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+def configure_from_env():
+    """
+    Writes spans to the file in `ARGO_TRACE`, if set.
+    """
+    path = os.getenv("ARGO_TRACE")
+
+    if path:
+        set_tracer(FileTracer(path))
+
+
+def current_span() -> Span:
+    """
+    Returns the active span, or a no-op span if tracing is disabled.
+    """
+    if _tracer is None:
+        return _NOOP
+
+    return _current.get() or _NOOP
+
+
+@contextlib.contextmanager
+def _span(tracer: Tracer, name: str, attributes: dict):
+    span = Span(name, _current.get(), attributes)
+    token = _current.set(span)
+    tracer.start(span)
+
+    try:
+        yield span
+    except BaseException as e:
+        span.set(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        span.end_time = time.time_ns()
+        tracer.export(span)
+
+
+_NOOP_CONTEXT = contextlib.nullcontext(_NOOP)
+
+
+def span(name: str, **attributes):
+    """
+    Context manager that traces the enclosed block as a child of the current span.
+    """
+    if _tracer is None:
+        return _NOOP_CONTEXT
+
+    return _span(_tracer, name, attributes)
+
+
+def traced(name: str):
+    """
+    Decorator that traces every call of an async function.
+    """
+
+    def decorator(target):
+        @functools.wraps(target)
+        async def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return await target(*args, **kwargs)
+
+            with _span(_tracer, name, {}):
+                return await target(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,5 +1,6 @@
+import hashlib
 from pydantic import BaseModel
-from typing import get_type_hints, Optional, Union
+from typing import Any, Iterable, get_type_hints, Optional, Union
 
 
 def type_to_str(tp):
@@ -74,3 +75,84 @@ def generate_pydantic_code(model_cls: type[BaseModel]) -> str:
     generate(model_cls, lines, visited)
 
     return "\n".join(lines)
+
+
+# a rough average for English text, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def chunks(text: str, size: int = 1000) -> Iterable[str]:
+    """
+    Splits a text into chunks of about `size` characters,
+    breaking at paragraphs where possible.
+    """
+    current = ""
+
+    for paragraph in text.split("\n\n"):
+        while len(paragraph) > size:
+            if current:
+                yield current
+                current = ""
+
+            yield paragraph[:size]
+            paragraph = paragraph[size:]
+
+        if current and len(current) + len(paragraph) + 2 > size:
+            yield current
+            current = ""
+
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+
+    if current.strip():
+        yield current
+
+
+def sample_schema(schema: dict, defs: dict | None = None) -> Any:
+    """
+    Builds a deterministic value that validates against a JSON schema.
+    """
+    defs = defs if defs is not None else schema.get("$defs", {})
+
+    if "$ref" in schema:
+        return sample_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"]
+        return sample_schema((options or schema["anyOf"])[0], defs)
+    if "allOf" in schema:
+        return sample_schema(schema["allOf"][0], defs)
+
+    kind = schema.get("type", "string")
+
+    if kind == "object":
+        return {
+            name: sample_schema(prop, defs)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [sample_schema(schema.get("items", {}), defs)]
+    if kind == "boolean":
+        return True
+    if kind == "integer":
+        return 0
+    if kind == "number":
+        return 0.0
+    if kind == "null":
+        return None
+
+    return "mock"
+
+
+def hash_embedding(text: str, dim: int = 64) -> list[float]:
+    """
+    A deterministic bag of hashed words, so similar texts get similar vectors.
+    """
+    vector = [0.0] * dim
+
+    for word in text.lower().split():
+        vector[int.from_bytes(hashlib.md5(word.encode()).digest()[:4], "little") % dim] += 1.0
+
+    return vector
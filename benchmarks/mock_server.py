@@ -0,0 +1,226 @@
+"""
+A deterministic mock of the OpenAI API, to benchmark argo without model latency.
+
+Chat and completion requests are answered with a canned reply, streamed
+word by word at a configurable rate after a configurable initial latency.
+Structured output requests are answered with a deterministic instance
+of the requested JSON schema (first enum value, `true`, zeros, etc.),
+and embeddings are deterministic bags of hashed words.
+
+Run it standalone with:
+
+    python -m benchmarks.mock_server --port 8080 --latency 0.2 --tokens-per-second 50
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from argo.utils import hash_embedding, sample_schema
+
+
+DEFAULT_REPLY = "This is a canned reply from the mock server, used to benchmark argo."
+
+
+def create_app(
+    latency: float = 0.0, tokens_per_second: float = 0.0, reply: str = DEFAULT_REPLY
+) -> FastAPI:
+    """
+    Builds the mock server.
+
+    `latency` is the delay before the first token (or the whole response),
+    and `tokens_per_second` limits the streaming rate (0 means unlimited).
+    """
+    app = FastAPI()
+    tokens = [t + " " for t in reply.split()]
+    app.state.requests = 0
+
+    def usage(prompt: Any, completion: int) -> dict:
+        prompt_tokens = len(json.dumps(prompt)) // 4
+        return dict(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion,
+            total_tokens=prompt_tokens + completion,
+        )
+
+    async def stream(build_chunk, body: dict):
+        await asyncio.sleep(latency)
+
+        for token in tokens:
+            yield f"data: {json.dumps(build_chunk(token, None))}\n\n"
+
+            if tokens_per_second:
+                await asyncio.sleep(1 / tokens_per_second)
+
+        yield f"data: {json.dumps(build_chunk(None, 'stop'))}\n\n"
+
+        if body.get("stream_options", {}).get("include_usage"):
+            final = build_chunk(None, None) | dict(choices=[])
+            final["usage"] = usage(body.get("messages", body.get("prompt")), len(tokens))
+            yield f"data: {json.dumps(final)}\n\n"
+
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        response_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if body.get("stream"):
+
+            def chunk(token, finish_reason):
+                delta = {} if token is None else dict(content=token)
+                return dict(
+                    id=response_id,
+                    object="chat.completion.chunk",
+                    created=created,
+                    model=body["model"],
+                    choices=[dict(index=0, delta=delta, finish_reason=finish_reason)],
+                )
+
+            return StreamingResponse(stream(chunk, body), media_type="text/event-stream")
+
+        response_format = body.get("response_format") or {}
+
+        if response_format.get("type") == "json_schema":
+            content = json.dumps(sample_schema(response_format["json_schema"]["schema"]))
+        else:
+            content = reply
+
+        await asyncio.sleep(latency)
+
+        if tokens_per_second:
+            await asyncio.sleep(len(content.split()) / tokens_per_second)
+
+        return JSONResponse(
+            dict(
+                id=response_id,
+                object="chat.completion",
+                created=created,
+                model=body["model"],
+                choices=[
+                    dict(
+                        index=0,
+                        message=dict(role="assistant", content=content, refusal=None),
+                        finish_reason="stop",
+                        logprobs=None,
+                    )
+                ],
+                usage=usage(body["messages"], len(content.split())),
+            )
+        )
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        response_id = f"cmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def chunk(token, finish_reason):
+            return dict(
+                id=response_id,
+                object="text_completion",
+                created=created,
+                model=body["model"],
+                choices=[
+                    dict(index=0, text=token or "", finish_reason=finish_reason, logprobs=None)
+                ],
+            )
+
+        return StreamingResponse(stream(chunk, body), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        await asyncio.sleep(latency)
+
+        prompt_tokens = sum(len(t.split()) for t in texts)
+
+        return JSONResponse(
+            dict(
+                object="list",
+                model=body["model"],
+                data=[
+                    dict(object="embedding", index=i, embedding=hash_embedding(t))
+                    for i, t in enumerate(texts)
+                ],
+                usage=dict(prompt_tokens=prompt_tokens, total_tokens=prompt_tokens),
+            )
+        )
+
+    return app
+
+
+class MockServer:
+    """
+    Runs the mock server (or any ASGI app) with uvicorn in a background thread.
+
+    Use it as a context manager:
+
+        with MockServer(latency=0.1) as server:
+            llm = LLM("mock", base_url=server.base_url, api_key="mock")
+    """
+
+    def __init__(self, app: FastAPI | None = None, host: str = "127.0.0.1", port: int = 0, **kwargs):
+        import uvicorn
+
+        self.app = app or create_app(**kwargs)
+        self.server = uvicorn.Server(
+            uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "MockServer":
+        self.thread.start()
+
+        while not self.server.started:
+            time.sleep(0.01)
+
+        return self
+
+    def __exit__(self, *args):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def serve(host: str = "127.0.0.1", port: int = 8080, **kwargs):
+    import uvicorn
+
+    uvicorn.run(create_app(**kwargs), host=host, port=port, log_level="warning")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    args = parser.parse_args()
+
+    serve(
+        args.host,
+        args.port,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+    )
+
+
+if __name__ == "__main__":
+    main()
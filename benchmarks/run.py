@@ -0,0 +1,388 @@
+"""
+Benchmarks for argo's own overhead, run against the mock OpenAI server.
+
+Each benchmark runs one operation many times and reports throughput,
+p50/p99 latency and peak memory allocated per operation.
+With zero mock latency, these numbers are dominated by argo itself
+(plus the local HTTP round trip), so regressions in hot paths show up here.
+
+    python -m benchmarks.run --iterations 200
+    python -m benchmarks.run --filter context --json results.json
+    python -m benchmarks.run --compare results.json --tolerance 0.2
+
+With `--fake`, the LLM uses an in-memory backend instead of the mock server,
+so even the HTTP round trip is left out and only argo's orchestration is measured.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import socket
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Awaitable, Callable
+
+import rich
+from pydantic import BaseModel
+from rich.table import Table
+
+from argo import ChatAgent, Context, LLM, Message
+from argo.agent import AgentBase
+from argo.backends import FakeBackend
+from argo.client import stream
+from argo.crew import Crew, MemoryBoard
+from argo.skills import chat
+
+from .mock_server import MockServer, serve
+
+
+type Operation = Callable[[], Awaitable]
+
+
+class Result(BaseModel):
+    name: str
+    iterations: int
+    ops_per_second: float
+    p50_ms: float
+    p99_ms: float
+    peak_kib: float
+
+
+BENCHMARKS: dict[str, Callable[["Environment"], Awaitable[Operation]]] = {}
+
+
+def benchmark(name: str):
+    """
+    Registers a benchmark, as an async function that prepares
+    everything and returns the operation to measure.
+    Anything that must be shut down afterwards goes in `env.resources`.
+    """
+
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+class Environment:
+    def __init__(self, base_url: str | None):
+        self.base_url = base_url
+        # resources of the benchmark being run, released when it finishes
+        self.resources = contextlib.AsyncExitStack()
+
+    def llm(self) -> LLM:
+        if self.base_url is None:
+            return LLM("fake", backend=FakeBackend())
+
+        return LLM("mock", base_url=self.base_url, api_key="mock")
+
+    def agent(self) -> ChatAgent:
+        agent = ChatAgent("Bench", "An agent for benchmarks.", self.llm(), skills=[chat])
+
+        @agent.tool
+        async def add(a: int, b: int) -> int:
+            """Adds two numbers."""
+            return a + b
+
+        return agent
+
+    def context(self) -> Context:
+        agent = self.agent()
+        return Context(agent, [Message.system(agent.system_prompt), Message.user("Hello!")])
+
+
+class Answer(BaseModel):
+    text: str
+    confidence: float
+
+
+@benchmark("llm.chat")
+async def llm_chat(env: Environment) -> Operation:
+    llm, messages = env.llm(), [Message.user("Hello!")]
+    return lambda: llm.chat(messages)
+
+
+@benchmark("llm.create")
+async def llm_create(env: Environment) -> Operation:
+    llm, messages = env.llm(), [Message.user("Hello!")]
+    return lambda: llm.create(Answer, messages)
+
+
+@benchmark("llm.complete")
+async def llm_complete(env: Environment) -> Operation:
+    llm = env.llm()
+    return lambda: llm.complete("Hello")
+
+
+@benchmark("context.reply")
+async def context_reply(env: Environment) -> Operation:
+    ctx = env.context()
+    return lambda: ctx.reply(persistent=False)
+
+
+@benchmark("context.decide")
+async def context_decide(env: Environment) -> Operation:
+    ctx = env.context()
+    return lambda: ctx.decide("Is this a greeting?")
+
+
+@benchmark("context.choose")
+async def context_choose(env: Environment) -> Operation:
+    ctx = env.context()
+    return lambda: ctx.choose(["greeting", "question", "complaint"])
+
+
+@benchmark("context.equip")
+async def context_equip(env: Environment) -> Operation:
+    ctx = env.context()
+    return lambda: ctx.equip()
+
+
+@benchmark("context.engage")
+async def context_engage(env: Environment) -> Operation:
+    ctx = env.context()
+    return lambda: ctx.engage()
+
+
+@benchmark("context.invoke")
+async def context_invoke(env: Environment) -> Operation:
+    ctx = env.context()
+    tool = ctx.agent.tools[0]
+    return lambda: ctx.invoke(tool)
+
+
+@benchmark("context.create")
+async def context_create(env: Environment) -> Operation:
+    ctx = env.context()
+    return lambda: ctx.create(model=Answer)
+
+
+@benchmark("agent.perform")
+async def agent_perform(env: Environment) -> Operation:
+    agent = env.agent()
+
+    async def perform():
+        async for _ in agent.perform(Message.user("Hello!")):
+            pass
+
+    return perform
+
+
+@benchmark("client.stream")
+async def client_stream(env: Environment) -> Operation:
+    agent = env.agent()
+    return lambda: asyncio.to_thread(lambda: list(stream(agent, "Hello!")))
+
+
+class Ping(BaseModel):
+    n: int
+
+
+class Pong(BaseModel):
+    n: int
+
+
+class Forward(AgentBase[Ping, Pong]):
+    async def process(self, input: Ping):
+        yield Pong(n=input.n)
+
+
+class Sink(AgentBase[Pong, None]):
+    async def process(self, input: Pong):
+        return
+        yield
+
+
+@benchmark("crew.100_messages")
+async def crew_throughput(env: Environment) -> Operation:
+    async def run():
+        crew = Crew(MemoryBoard(), [Forward(), Sink()], seed=[Ping(n=i) for i in range(100)])
+        await crew.loop(until_idle=True)
+
+    return run
+
+
+@benchmark("server.chat_completions")
+async def server_completions(env: Environment) -> Operation:
+    import openai
+    from argo.server import build
+
+    server = env.resources.enter_context(MockServer(build(env.agent())))
+    client = openai.AsyncOpenAI(base_url=server.base_url, api_key="mock")
+    env.resources.push_async_callback(client.close)
+
+    async def request():
+        async for _ in await client.chat.completions.create(
+            model="Bench",
+            messages=[dict(role="user", content="Hello!")],
+            stream=True,
+        ):
+            pass
+
+    return request
+
+
+async def measure(name: str, operation: Operation, iterations: int, warmup: int) -> Result:
+    for _ in range(warmup):
+        await operation()
+
+    latencies = []
+    start = time.perf_counter()
+
+    for _ in range(iterations):
+        t = time.perf_counter()
+        await operation()
+        latencies.append(time.perf_counter() - t)
+
+    elapsed = time.perf_counter() - start
+
+    # memory is traced in a separate pass, since tracing slows everything down
+    peaks = []
+    tracemalloc.start()
+
+    for _ in range(min(iterations, 10)):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await operation()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+
+    tracemalloc.stop()
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+
+    return Result(
+        name=name,
+        iterations=iterations,
+        ops_per_second=iterations / elapsed,
+        p50_ms=quantiles[49] * 1000,
+        p99_ms=quantiles[98] * 1000,
+        peak_kib=statistics.mean(peaks) / 1024,
+    )
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+
+    raise TimeoutError("Mock server didn't start.")
+
+
+async def run(names: list[str], iterations: int, warmup: int, base_url: str | None) -> list[Result]:
+    env = Environment(base_url)
+    results = []
+
+    for name in names:
+        async with env.resources:
+            operation = await BENCHMARKS[name](env)
+            results.append(await measure(name, operation, iterations, warmup))
+
+    return results
+
+
+def report(results: list[Result], baseline: dict[str, Result]):
+    table = Table(title="argo benchmarks")
+
+    for column in ["benchmark", "ops/s", "p50 (ms)", "p99 (ms)", "peak KiB/op", "vs baseline"]:
+        table.add_column(column, justify="left" if column == "benchmark" else "right")
+
+    for r in results:
+        change = ""
+
+        if r.name in baseline:
+            ratio = r.ops_per_second / baseline[r.name].ops_per_second - 1
+            change = f"{ratio:+.1%}"
+
+        table.add_row(
+            r.name,
+            f"{r.ops_per_second:.1f}",
+            f"{r.p50_ms:.2f}",
+            f"{r.p99_ms:.2f}",
+            f"{r.peak_kib:.1f}",
+            change,
+        )
+
+    rich.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--filter", default="", help="Only run benchmarks containing this text.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mock model latency in seconds.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--fake", action="store_true", help="Use an in-memory backend instead of the mock server.")
+    parser.add_argument("--json", help="Write results to this file.")
+    parser.add_argument("--compare", help="Compare against results in this file.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Fail if throughput drops more than this fraction versus the baseline.",
+    )
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+
+    if args.fake:
+        results = asyncio.run(run(names, args.iterations, args.warmup, None))
+    else:
+        # the mock server runs in its own process, so it doesn't skew timings or allocations
+        port = _free_port()
+        mock = multiprocessing.Process(
+            target=serve,
+            kwargs=dict(port=port, latency=args.latency, tokens_per_second=args.tokens_per_second),
+            daemon=True,
+        )
+        mock.start()
+
+        try:
+            _wait_for(port)
+            results = asyncio.run(
+                run(names, args.iterations, args.warmup, f"http://127.0.0.1:{port}/v1")
+            )
+        finally:
+            mock.terminate()
+
+    baseline = {}
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = {r["name"]: Result(**r) for r in json.load(fp)}
+
+    report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            json.dump([r.model_dump() for r in results], fp, indent=2)
+
+    regressions = [
+        r.name
+        for r in results
+        if r.name in baseline
+        and r.ops_per_second < baseline[r.name].ops_per_second * (1 - args.tolerance)
+    ]
+
+    if regressions:
+        rich.print(f"[red]Regressions in: {', '.join(regressions)}[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+from pydantic import BaseModel
+
+from argo.agent import AgentBase
+from argo.boards import ProcessBoard, SQLiteBoard
+from argo.crew import Crew
+
+
+class Note(BaseModel):
+    text: str
+
+
+class Reply(BaseModel):
+    text: str
+
+
+class Echo(AgentBase[Note, Reply]):
+    async def process(self, input: Note):
+        yield Reply(text=input.text)
+
+
+class Collector(AgentBase[Reply, None]):
+    def __init__(self):
+        self.replies: list[str] = []
+
+    async def process(self, input: Reply):
+        self.replies.append(input.text)
+        return
+        yield
+
+
+def slow_takes(board, delay: float = 0.1):
+    # claims that are still running in their thread when the caller is cancelled
+    take = board._take
+
+    def slow(*args):
+        time.sleep(delay)
+        return take(*args)
+
+    board._take = slow
+
+
+@pytest.fixture(params=["sqlite", "process"])
+def board(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBoard(str(tmp_path / "board.db"), poll_interval=0.01)
+
+    return ProcessBoard(poll_interval=0.01)
+
+
+def test_cancelled_get_keeps_the_message(board):
+    async def main():
+        await board.post(Note(text="hi"))
+        slow_takes(board)
+
+        task = asyncio.create_task(board.get(Note))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # let the claim finish in its thread
+        await asyncio.sleep(0.1)
+        assert await board.size(Note) == 1
+
+    asyncio.run(main())
+
+
+def test_messages_are_pending_until_acked(board):
+    async def main():
+        await board.post(Note(text="hi"))
+        note = await board.get(Note)
+        assert await board.size(Note) == 1
+
+        await board.release(note)
+        note = await board.get(Note)
+        assert note.text == "hi"
+
+        await board.ack(note)
+        assert await board.size(Note) == 0
+
+    asyncio.run(main())
+
+
+def test_sqlite_board_redelivers_after_the_lease(tmp_path):
+    path = str(tmp_path / "board.db")
+
+    async def crash():
+        board = SQLiteBoard(path)
+        await board.post(Note(text="hi"))
+        # taken by a worker that dies before acknowledging it
+        await board.get(Note)
+
+    async def restart():
+        board = SQLiteBoard(path, lease=0)
+        note = await asyncio.wait_for(board.get(Note), 5)
+        assert note.text == "hi"
+
+        await board.ack(note)
+        assert board.pending() == 0
+
+    asyncio.run(crash())
+    asyncio.run(restart())
+
+
+def test_crew_on_remote_board_runs_until_idle(board):
+    collector = Collector()
+    crew = Crew(board, [Echo(), collector], seed=[Note(text=str(i)) for i in range(5)])
+
+    asyncio.run(asyncio.wait_for(crew.loop(until_idle=True), 10))
+
+    # replies are counted as pending while they are handed over, so none is left behind
+    assert sorted(collector.replies) == [str(i) for i in range(5)]
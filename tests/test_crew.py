@@ -0,0 +1,272 @@
+import asyncio
+import os
+
+import pytest
+from pydantic import BaseModel
+
+from argo.agent import AgentBase
+from argo.crew import Crew, MemoryBoard, MessageBoard
+
+
+class Event(BaseModel):
+    name: str
+
+
+class Alert(Event):
+    level: int = 0
+
+
+def drain(board: MemoryBoard, message_type: type, subscriber: str) -> list:
+    async def take():
+        return [
+            await board.receive(message_type, subscriber)
+            for _ in range(await board.size(message_type, subscriber))
+        ]
+
+    return asyncio.run(take())
+
+
+def test_memory_board_routes_subtypes():
+    board = MemoryBoard()
+    board.subscribe(Event, "events")
+    board.subscribe(Alert, "alerts")
+
+    async def main():
+        await board.post(Event(name="plain"))
+        await board.post(Alert(name="fire"))
+
+    asyncio.run(main())
+
+    # subscribers of a base type also get its subtypes, through the MRO
+    assert [e.name for e in drain(board, Event, "events")] == ["plain", "fire"]
+    assert [e.name for e in drain(board, Alert, "alerts")] == ["fire"]
+
+
+def test_memory_board_fans_out_to_subscribers():
+    board = MemoryBoard()
+    board.subscribe(Event, "log")
+    board.subscribe(Event, "audit")
+
+    async def main():
+        for name in ["a", "b"]:
+            await board.post(Event(name=name))
+
+    asyncio.run(main())
+
+    # every subscriber gets its own copy of each message
+    assert [e.name for e in drain(board, Event, "log")] == ["a", "b"]
+    assert [e.name for e in drain(board, Event, "audit")] == ["a", "b"]
+
+
+def test_memory_board_routes_new_subscribers():
+    board = MemoryBoard()
+    board.subscribe(Event, "events")
+
+    async def main():
+        # resolves and caches the route for Alert before anyone else subscribes
+        await board.post(Alert(name="first"))
+        board.subscribe(Alert, "alerts")
+        await board.post(Alert(name="second"))
+
+    asyncio.run(main())
+
+    assert [e.name for e in drain(board, Event, "events")] == ["first", "second"]
+    assert [e.name for e in drain(board, Alert, "alerts")] == ["second"]
+
+
+def test_memory_board_delivers_orphans_on_subscribe():
+    board = MemoryBoard()
+
+    asyncio.run(board.post(Alert(name="early")))
+    board.subscribe(Event, "events")
+
+    assert [e.name for e in drain(board, Event, "events")] == ["early"]
+
+
+def test_memory_board_priority():
+    board = MemoryBoard(priority=lambda m: getattr(m, "level", 0))
+    board.subscribe(Event, "events")
+
+    async def main():
+        await board.post(Event(name="low"))
+        await board.post(Alert(name="high", level=5))
+        await board.post(Event(name="urgent"), priority=10)
+        await board.post(Event(name="later"))
+
+    asyncio.run(main())
+
+    assert [e.name for e in drain(board, Event, "events")] == ["urgent", "high", "low", "later"]
+
+
+class Job(BaseModel):
+    n: int
+
+
+class Done(BaseModel):
+    n: int
+
+
+class Worker(AgentBase[Job, Done]):
+    def __init__(self, gate: asyncio.Event | None = None):
+        self.gate = gate
+        self.started: list[int] = []
+
+    async def process(self, input: Job):
+        self.started.append(input.n)
+
+        if self.gate is not None:
+            await self.gate.wait()
+
+        yield Done(n=input.n)
+
+
+class Collector(AgentBase[Done, None]):
+    def __init__(self):
+        self.done: list[int] = []
+
+    async def process(self, input: Done):
+        self.done.append(input.n)
+        return
+        yield
+
+
+def test_crew_until_idle_leaves_no_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "crew.pkl")
+    collector = Collector()
+    crew = Crew(
+        MemoryBoard(), [Worker(), collector], seed=[Job(n=1), Job(n=2)], checkpoint=checkpoint
+    )
+
+    asyncio.run(crew.loop(until_idle=True))
+
+    assert sorted(collector.done) == [1, 2]
+    # a finished run starts from its seed again
+    assert not os.path.exists(checkpoint)
+
+
+def test_crew_stop_drains():
+    collector = Collector()
+
+    async def main():
+        crew = Crew(MemoryBoard(), [Worker(), collector], seed=[Job(n=i) for i in range(5)])
+        task = crew.start()
+        await asyncio.sleep(0)
+        await crew.stop(timeout=5)
+        await task
+
+    asyncio.run(main())
+    assert sorted(collector.done) == list(range(5))
+
+
+def test_crew_stop_checkpoints_and_resumes(tmp_path):
+    checkpoint = str(tmp_path / "crew.pkl")
+    blocked = Worker(gate=asyncio.Event())
+
+    async def interrupt():
+        crew = Crew(MemoryBoard(), [blocked], seed=[Job(n=1), Job(n=2)], checkpoint=checkpoint)
+        task = crew.start()
+
+        while not blocked.started:
+            await asyncio.sleep(0.01)
+
+        await crew.stop(drain=False)
+        await task
+
+    asyncio.run(interrupt())
+    assert blocked.started == [1]
+    assert os.path.exists(checkpoint)
+
+    # the interrupted and pending jobs are restored instead of the seed
+    worker = Worker()
+    collector = Collector()
+    crew = Crew(MemoryBoard(), [worker, collector], seed=[Job(n=99)], checkpoint=checkpoint)
+    asyncio.run(crew.loop(until_idle=True))
+
+    assert worker.started == [1, 2]
+    assert collector.done == [1, 2]
+    assert not os.path.exists(checkpoint)
+
+
+class UnsizedBoard(MessageBoard):
+    def __init__(self):
+        self.queue = asyncio.Queue()
+
+    async def get(self, message_type):
+        return await self.queue.get()
+
+    async def post(self, message):
+        await self.queue.put(message)
+
+
+def test_crew_stop_without_size_cancels_workers():
+    async def main():
+        crew = Crew(UnsizedBoard(), [Worker()])
+        task = crew.start()
+        await asyncio.sleep(0.01)
+
+        # the board can't tell if it's drained, but the workers are still cancelled
+
+        with pytest.raises(TypeError):
+            await crew.stop()
+
+        await task
+        assert all(t.done() for t in crew._tasks)
+
+    asyncio.run(main())
+
+
+def test_memory_board_bounds_orphans():
+    board = MemoryBoard(orphans=2)
+
+    async def main():
+        for name in ["a", "b", "c"]:
+            await board.post(Event(name=name))
+
+    asyncio.run(main())
+
+    # unrouted messages aren't pending work, and only the last ones are kept
+    assert asyncio.run(board.size(Event)) == 0
+
+    board.subscribe(Event, "events")
+    assert [e.name for e in drain(board, Event, "events")] == ["b", "c"]
+
+
+def test_crew_without_consumer_for_results_leaves_no_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "crew.pkl")
+
+    # nobody subscribes to the Done messages of the last agent
+    first = Worker()
+    crew = Crew(MemoryBoard(), [first], seed=[Job(n=1), Job(n=2)], checkpoint=checkpoint)
+    asyncio.run(crew.loop(until_idle=True))
+    assert sorted(first.started) == [1, 2]
+    assert not os.path.exists(checkpoint)
+
+    second = Worker()
+    crew = Crew(MemoryBoard(), [second], seed=[Job(n=3)], checkpoint=checkpoint)
+    asyncio.run(crew.loop(until_idle=True))
+    assert second.started == [3]
+
+
+def test_crew_checkpoint_keeps_priorities(tmp_path):
+    checkpoint = str(tmp_path / "crew.pkl")
+    blocked = Worker(gate=asyncio.Event())
+
+    async def interrupt():
+        board = MemoryBoard(priority=lambda job: job.n)
+        crew = Crew(board, [blocked], seed=[Job(n=1), Job(n=5)], checkpoint=checkpoint)
+        task = crew.start()
+
+        while not blocked.started:
+            await asyncio.sleep(0.01)
+
+        await crew.stop(drain=False)
+        await task
+
+    asyncio.run(interrupt())
+    assert blocked.started == [5]
+
+    # the interrupted job keeps its priority, without a priority function
+    worker = Worker()
+    crew = Crew(MemoryBoard(), [worker], checkpoint=checkpoint)
+    asyncio.run(crew.loop(until_idle=True))
+    assert worker.started == [5, 1]
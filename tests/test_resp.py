@@ -0,0 +1,26 @@
+import asyncio
+
+from argo.resp import RedisClient, RedisStandIn
+
+
+def test_cancelled_command_does_not_leak_its_reply():
+    async def main():
+        server = RedisStandIn(port=0)
+        await server.start()
+        client = RedisClient(server.host, server.port)
+
+        try:
+            # cancelled after the command is sent, before its reply arrives
+            pop = asyncio.create_task(client.execute("BLPOP", "jobs", 5))
+            await asyncio.sleep(0.05)
+            pop.cancel()
+            await asyncio.gather(pop, return_exceptions=True)
+
+            await client.execute("RPUSH", "jobs", "a")
+            await client.execute("SET", "key", "value")
+            assert await client.execute("GET", "key") == b"value"
+        finally:
+            await client.close()
+            await server.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,21 @@
+import pytest
+
+from argo import LLM
+from argo.backends import FakeBackend
+from argo.router import Backend, RouterLLM
+
+
+def test_threshold_at_extreme_quantiles():
+    backend = Backend(LLM("fake", backend=FakeBackend()))
+    backend.samples["chat"].extend(float(i) for i in range(1, 41))
+
+    assert backend.threshold("chat", 0.5, min_samples=20) == 20.5
+    # quantiles beyond the 1st and 99th percentiles use those
+    assert backend.threshold("chat", 1.0, min_samples=20) == backend.threshold("chat", 0.99, 20)
+    assert backend.threshold("chat", 0.001, min_samples=20) == backend.threshold("chat", 0.01, 20)
+
+
+@pytest.mark.parametrize("quantile", [0, 1, 1.5])
+def test_router_rejects_invalid_quantiles(quantile):
+    with pytest.raises(ValueError):
+        RouterLLM([LLM("fake", backend=FakeBackend())], quantile=quantile)
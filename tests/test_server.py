@@ -0,0 +1,70 @@
+import json
+import urllib.request
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+
+from argo import LLM, ChatAgent  # noqa: E402
+from argo.backends import FakeBackend  # noqa: E402
+from argo.server import build  # noqa: E402
+from benchmarks.mock_server import MockServer  # noqa: E402
+
+
+def make_agent() -> ChatAgent:
+    agent = ChatAgent(name="Tools", description="Tools.", llm=LLM("fake", backend=FakeBackend()))
+
+    @agent.tool
+    async def add(a: int, b: int) -> int:
+        """Adds two numbers."""
+        return a + b
+
+    @agent.tool
+    async def broken(a: int) -> int:
+        """Returns something that isn't a number."""
+        return "not a number"  # type: ignore
+
+    @agent.tool
+    async def log(text: str) -> None:
+        """Returns nothing."""
+
+    return agent
+
+
+def post(server: MockServer, path: str, data) -> dict | list:
+    url = server.base_url.removesuffix("/v1") + path
+    request = urllib.request.Request(
+        url, json.dumps(data).encode(), {"Content-Type": "application/json"}
+    )
+
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def test_tool_routes():
+    with MockServer(build(make_agent())) as server:
+        assert post(server, "/add", dict(a=1, b=2))["result"] == 3
+        assert post(server, "/log", dict(text="hi")) == dict(tool="log", result=None, error=None)
+
+        # a result that doesn't match the annotation is reported, not a server error
+        result = post(server, "/broken", dict(a=1))
+        assert result["result"] is None
+        assert result["error"]
+
+
+def test_batch_isolates_failing_calls():
+    calls = [
+        dict(tool="add", parameters=dict(a=1, b=2)),
+        dict(tool="broken", parameters=dict(a=1)),
+        dict(tool="add", parameters=dict(a="x")),
+        dict(tool="missing"),
+        dict(tool="log", parameters=dict(text="hi")),
+    ]
+
+    with MockServer(build(make_agent())) as server:
+        results = post(server, "/tools/batch", calls)
+
+    assert [r["tool"] for r in results] == ["add", "broken", "add", "missing", "log"]
+    assert results[0] == dict(tool="add", result=3, error=None)
+    assert [r["error"] is not None for r in results] == [False, True, True, True, False]
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import struct
+
+from argo.llm import Message
+from argo.sessions import LogStore
+
+
+def contents(messages: list[Message]) -> list[str]:
+    return [m.content for m in messages]
+
+
+def test_log_store_round_trip(tmp_path):
+    async def main():
+        store = LogStore(str(tmp_path / "sessions.log"))
+        await store.append("a", [Message.user("hi"), Message.assistant("hello")])
+        await store.append("b", [Message.user("other")])
+        await store.append("a", [Message.user("bye")])
+
+        assert contents(await store.load("a")) == ["hi", "hello", "bye"]
+        assert contents(await store.load("a", limit=2)) == ["hello", "bye"]
+        assert contents(await store.load("b")) == ["other"]
+        assert await store.load("missing") == []
+
+        messages = await store.load("a")
+        assert [m.role for m in messages] == ["user", "assistant", "user"]
+
+    asyncio.run(main())
+
+
+def test_log_store_reopen(tmp_path):
+    path = str(tmp_path / "sessions.log")
+
+    async def write():
+        store = LogStore(path)
+        await store.append("a", [Message.user("one"), Message.user("two")])
+        await store.append("b", [Message.user("three")])
+        await store.delete("b")
+
+    async def read():
+        store = LogStore(path)
+        assert contents(await store.load("a")) == ["one", "two"]
+        assert await store.load("b") == []
+
+        await store.append("a", [Message.user("four")])
+        assert contents(await store.load("a")) == ["one", "two", "four"]
+
+    asyncio.run(write())
+    asyncio.run(read())
+
+
+def test_log_store_drops_torn_tail(tmp_path):
+    path = str(tmp_path / "sessions.log")
+
+    async def write():
+        store = LogStore(path)
+        await store.append("a", [Message.user("kept")])
+
+    asyncio.run(write())
+    size = os.path.getsize(path)
+
+    # a record cut short by a crash: its header promises more bytes than were written
+    with open(path, "ab") as fp:
+        fp.write(struct.pack("<IH", 100, 1) + b"am{")
+
+    async def read():
+        store = LogStore(path)
+        assert os.path.getsize(path) == size
+        assert contents(await store.load("a")) == ["kept"]
+
+        await store.append("a", [Message.user("next")])
+        assert contents(await store.load("a")) == ["kept", "next"]
+
+    asyncio.run(read())
+    assert contents(asyncio.run(LogStore(path).load("a"))) == ["kept", "next"]
+
+
+def test_log_store_compaction(tmp_path):
+    path = str(tmp_path / "sessions.log")
+
+    async def main():
+        store = LogStore(path, compact_min=0)
+
+        for i in range(10):
+            await store.append(f"dead-{i}", [Message.user("x" * 100)])
+
+        await store.append("live", [Message.user("a"), Message.assistant("b")])
+        before = os.path.getsize(path)
+
+        for i in range(10):
+            await store.delete(f"dead-{i}")
+
+        # deleting most of the log triggers a compaction
+        assert os.path.getsize(path) < before
+        assert store.dead == 0
+        assert contents(await store.load("live")) == ["a", "b"]
+
+        await store.append("live", [Message.user("c")])
+        assert contents(await store.load("live")) == ["a", "b", "c"]
+
+    asyncio.run(main())
+
+    async def reopen():
+        store = LogStore(path)
+        assert contents(await store.load("live")) == ["a", "b", "c"]
+        assert await store.load("dead-0") == []
+
+    asyncio.run(reopen())